@@ -26,6 +26,7 @@ from os import stat
 from os.path import join as join_path, isabs as is_absolute_path
 from shlex import split as split_args
 from subprocess import Popen, PIPE
+from threading import Timer, Event
 from ..misc import Switchable
 
 
@@ -33,11 +34,17 @@ class CheckError(Exception):
     pass
 
 
+class CheckTimeoutError(CheckError):
+    pass
+
+
 class CheckGroupError(Exception):
     pass
 
 
-class Check(Switchable):
+# Mixin holding the status of a check. Both checks and the state a client
+# holds for a check (see ClientCheck) are updated and replied the same way.
+class CheckStatus(object):
 
     STATUS = {
         'ERROR': -1,
@@ -48,23 +55,12 @@ class Check(Switchable):
         'TIMEOUT': 4,
     }
 
-    def __init__(self, id=None, name='', path='', args='', details='', data=None, enabled=True, platform_setup=None):
-        super(Check, self).__init__(id=id, enabled=enabled)
+    STATUS_VALUES = frozenset(STATUS.values())
 
-        if not name or not path:
-            raise CheckError('Error - Missing name and/or path from check definition.')
-
-        self.name = name
-        self.path = path
-        self.args = args
-        self.details = details
-        self.data = data
-        self.current_status = self.STATUS['UNKNOWN']
-        self.previous_status = self.STATUS['UNKNOWN']
-        self._platform_setup = platform_setup
+    __slots__ = []
 
     def _update_matches(self, check_status):
-        return (self.id == check_status['id']) and (check_status['status'] in self.STATUS.values()) and \
+        return (self.id == check_status['id']) and (check_status['status'] in self.STATUS_VALUES) and \
             self.enabled
 
     def update_status(self, check_status):
@@ -85,14 +81,91 @@ class Check(Switchable):
     @staticmethod
     def get_status(status):
         try:
-            return Check.STATUS.keys()[Check.STATUS.values().index(status)]
+            return CheckStatus.STATUS.keys()[CheckStatus.STATUS.values().index(status)]
         except ValueError:
             raise CheckError('Error - Invalid status value : \'{:}\'.'.format(status))
 
+    def to_check_reply_dict(self):
+        d = {
+            'id': self.id,
+            'status': self.current_status,
+        }
+
+        if self.details:
+            d.update({'details': self.details})
+
+        if self.data:
+            d.update({'data': self.data})
+
+        return d
+
+
+class Check(Switchable, CheckStatus):
+
+    TYPES = ['executable', 'python', 'passive']
+
+    __slots__ = [
+        'name', 'path', 'args', 'timeout', 'ttl', 'interval', 'type', 'details', 'data', 'current_status',
+        'previous_status', '_platform_setup', '_python_runner', '_exec_server',
+    ]
+
+    # Shared by all checks, see _prepare.
+    _prepared = {}
+
+    def __init__(self, id=None, name='', path='', args='', timeout=None, ttl=None, interval=None, type='executable',
+                 details='', data=None, enabled=True, platform_setup=None, python_runner=None, exec_server=None):
+        super(Check, self).__init__(id=id, enabled=enabled)
+
+        if not name or not path:
+            raise CheckError('Error - Missing name and/or path from check definition.')
+
+        self.name = name
+        self.path = path
+        self.args = args
+        self.timeout = self._validate_timeout(timeout)
+        self.ttl = self._validate_ttl(ttl)
+        self.interval = self._validate_interval(interval)
+        self.type = self._validate_type(type)
+        self.details = details
+        self.data = data
+        self.current_status = self.STATUS['UNKNOWN']
+        self.previous_status = self.STATUS['UNKNOWN']
+        self._platform_setup = platform_setup
+        self._python_runner = python_runner
+        self._exec_server = exec_server
+
+    @staticmethod
+    def _validate_timeout(timeout):
+        if (timeout is not None) and (type(timeout) not in [int, float] or timeout <= 0):
+            raise CheckError('Error - \'{:}\' is not a valid check timeout.'.format(timeout))
+
+        return timeout
+
+    @staticmethod
+    def _validate_ttl(ttl):
+        if (ttl is not None) and (type(ttl) not in [int, float] or ttl < 0):
+            raise CheckError('Error - \'{:}\' is not a valid check ttl.'.format(ttl))
+
+        return ttl
+
+    @staticmethod
+    def _validate_interval(interval):
+        if (interval is not None) and (type(interval) not in [int, float] or interval <= 0):
+            raise CheckError('Error - \'{:}\' is not a valid check interval.'.format(interval))
+
+        return interval
+
+    @staticmethod
+    def _validate_type(check_type):
+        if check_type not in Check.TYPES:
+            raise CheckError('Error - \'{:}\' is not a valid check type.'.format(check_type))
+
+        return check_type
+
     def to_dict(self):
         return super(Check, self).to_dict([
-            'id', 'name', 'path', 'args', 'current_status', 'previous_status',
-            'details', 'data', 'enabled',
+            'id', 'name', 'path', 'args', 'timeout', 'ttl', 'interval', 'type', 'current_status',
+            'previous_status', 'details', 'data', 'enabled',
         ])
 
     def to_check_dict(self):
@@ -101,48 +174,52 @@ class Check(Switchable):
         if self.args:
             d.update({'args': self.args})
 
-        return [d]
+        if self.timeout:
+            d.update({'timeout': self.timeout})
 
-    def to_check_reply_dict(self):
-        d = {
-            'id': self.id,
-            'status': self.current_status,
-        }
+        if self.ttl is not None:
+            d.update({'ttl': self.ttl})
 
-        if self.details:
-            d.update({'details': self.details})
+        if self.interval:
+            d.update({'interval': self.interval})
 
-        if self.data:
-            d.update({'data': self.data})
+        if self.type != 'executable':
+            d.update({'type': self.type})
 
-        return d
+        return [d]
 
-    def _deserialize_output(self, output):
+    def _parse_output(self, output):
         try:
             valid_fields = ['status', 'details', 'data']
-            d = {k.lower(): v for k, v in deserialize_json(output).iteritems() if k.lower() in valid_fields}
+            d = {k.lower(): v for k, v in output.iteritems() if k.lower() in valid_fields}
             d.update({
                 'status': self.STATUS[d['status'].upper()],
                 'id': self.id,
             })
-        except ValueError, e:
-            raise CheckError('Error - Couldn\'t parse JSON from check output. Details : {:}'.format(e))
+        except AttributeError:
+            raise CheckError('Error - Check output is not a JSON object.')
         except KeyError:
             raise CheckError('Error - Missing or invalid \'status\' from check output.')
 
         return d
 
-    def _build_absolute_path(self):
+    def _deserialize_output(self, output):
+        try:
+            return self._parse_output(deserialize_json(output))
+        except ValueError, e:
+            raise CheckError('Error - Couldn\'t parse JSON from check output. Details : {:}'.format(e))
+
+    def _get_filename(self):
         checks_directory = self._platform_setup.PLATFORM_CONFIG['checks']
-        return [self.path if is_absolute_path(self.path) else join_path(checks_directory, self.path)]
+        return self.path if is_absolute_path(self.path) else join_path(checks_directory, self.path)
+
+    def _build_absolute_path(self):
+        return [self._get_filename()]
 
     def _split_args(self):
         return split_args(self.args)
 
-    def _call_popen(self):
-        absolute_path = self._build_absolute_path()
-        filename = absolute_path[len(absolute_path) - 1]
-
+    def _enforce_ownership(self, filename):
         if self._platform_setup.config['enforce ownership'] and not self._owned_by_stated_user(filename):
             raise CheckError('Error - \'{:}\' is not owned by user : {:} / group : {:}.'.format(
                 filename,
@@ -150,15 +227,116 @@ class Check(Switchable):
                 self._platform_setup.config['run as']['group']
             ))
 
+    def _get_file_signature(self, filename):
         try:
-            return Popen(absolute_path + self._split_args(), stdout=PIPE).communicate()[0]
+            s = stat(filename)
         except OSError, e:
-            raise CheckError('Error - Couldn\'t run : {:} check. Details : {:}'.format(absolute_path, e))
+            raise CheckError('Error - Couldn\'t run : {:} check. Details : {:}'.format(filename, e))
+
+        return s.st_dev, s.st_ino, s.st_mtime, s.st_uid, s.st_gid
+
+    def _build_argv(self, filename):
+        path = self._build_absolute_path() if self.type == 'executable' else [filename]
+        return path + self._split_args()
+
+    # Checks are built again on every poll, so resolving their absolute path,
+    # arguments, interpreter and verifying their ownership is done once for
+    # every check (same path, arguments and type) and shared. This is only
+    # repeated if the check file gets modified, replaced or chowned.
+    def _prepare(self):
+        filename = self._get_filename()
+        signature = self._get_file_signature(filename)
+        key = (filename, self.args, self.type)
+        prepared = Check._prepared.get(key)
+
+        if prepared is None or prepared[0] != signature:
+            self._enforce_ownership(filename)
+            prepared = Check._prepared[key] = (signature, self._build_argv(filename))
+
+        return prepared[1]
+
+    # If an exec server is given the check is spawned (and timed out) by it
+    # instead of forking this process.
+    def _call_popen(self):
+        argv = self._prepare()
+
+        if self._exec_server is not None:
+            return self._exec_server.run(argv, self._get_timeout())
+
+        try:
+            process = Popen(argv, stdout=PIPE, **self._popen_options())
+        except OSError, e:
+            raise CheckError('Error - Couldn\'t run : {:} check. Details : {:}'.format(argv, e))
+
+        return self._communicate(process)
+
+    def _popen_options(self):
+        return {}
+
+    def _kill(self, process):
+        process.kill()
+
+    def _get_timeout(self):
+        return self.timeout or self._platform_setup.config['check timeout']
+
+    # A ttl of 0 is valid (it disables caching for this check).
+    def get_ttl(self):
+        return self.ttl if self.ttl is not None else self._platform_setup.config['cache ttl']
+
+    def _on_timeout(self, process, timed_out):
+        if process.returncode is None:
+            timed_out.set()
+
+            try:
+                self._kill(process)
+            except OSError:
+                pass
+
+    # The check is killed if it doesn't finish within its timeout (or the
+    # client's default one), its output is discarded as it's probably
+    # incomplete.
+    def _communicate(self, process):
+        timed_out = Event()
+        timer = Timer(self._get_timeout(), self._on_timeout, (process, timed_out))
+        timer.start()
+
+        try:
+            output = process.communicate()[0]
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            raise CheckTimeoutError('Error - Check didn\'t finish within {:} seconds.'.format(self._get_timeout()))
+
+        return output
+
+    # Python checks are modules exposing a run function, instead of being
+    # executed they're handed to the Python check runner, their output is
+    # either a dict or a JSON string.
+    def _call_python_runner(self):
+        argv = self._prepare()
+        output = self._python_runner.run(argv[0], argv[1:], self._get_timeout())
+
+        if isinstance(output, basestring):
+            return self._deserialize_output(output)
+
+        return self._parse_output(output)
+
+    def _execute(self):
+        if self.type == 'passive':
+            raise CheckError('Error - Passive checks are not run by Radar.')
+
+        if self.type == 'python':
+            return self._call_python_runner()
+
+        return self._deserialize_output(self._call_popen())
 
     def run(self):
         try:
-            deserialized_output = self._deserialize_output(self._call_popen())
-            self.update_status(deserialized_output)
+            self.update_status(self._execute())
+        except CheckTimeoutError, e:
+            self.current_status = self.STATUS['TIMEOUT']
+            self.details = str(e)
         except CheckError, e:
             self.current_status = self.STATUS['ERROR']
             self.details = str(e)
@@ -177,15 +355,28 @@ class Check(Switchable):
 
 
 class UnixCheck(Check):
+
+    __slots__ = []
+
     def __new__(cls, *args, **kwargs):
         try:
-            global getpwnam
+            global getpwnam, setsid, killpg, SIGKILL
             from pwd import getpwnam
+            from os import setsid, killpg
+            from signal import SIGKILL
         except ImportError:
             pass
 
         return super(UnixCheck, cls).__new__(cls, *args, **kwargs)
 
+    # Every check runs on its own process group, so killing it also kills
+    # any process it spawned.
+    def _popen_options(self):
+        return {'preexec_fn': setsid}
+
+    def _kill(self, process):
+        killpg(process.pid, SIGKILL)
+
     def _owned_by_user(self, filename):
         user = self._platform_setup.config['run as']['user']
 
@@ -207,17 +398,25 @@ class UnixCheck(Check):
 
 
 class WindowsCheck(Check):
+
+    __slots__ = []
+
     def __new__(cls, *args, **kwargs):
         try:
             global FindExecutable, FindExecutableError, GetFileSecurity, LookupAccountSid, OWNER_SECURITY_INFORMATION
+            global CREATE_NEW_PROCESS_GROUP
             from win32security import GetFileSecurity, LookupAccountSid, OWNER_SECURITY_INFORMATION
             from win32api import FindExecutable
             from pywintypes import error as FindExecutableError
+            from subprocess import CREATE_NEW_PROCESS_GROUP
         except ImportError:
             pass
 
         return super(WindowsCheck, cls).__new__(cls, *args, **kwargs)
 
+    def _popen_options(self):
+        return {'creationflags': CREATE_NEW_PROCESS_GROUP}
+
     def _find_interpreter(self, filename):
         try:
             return FindExecutable(filename)
@@ -252,6 +451,9 @@ class WindowsCheck(Check):
 
 
 class CheckGroup(Switchable):
+
+    __slots__ = ['name', 'checks']
+
     def __init__(self, name='', checks=[], enabled=True):
         super(CheckGroup, self).__init__(enabled=enabled)
 
@@ -285,3 +487,94 @@ class CheckGroup(Switchable):
             hashed = hash(self.name) ^ list(self.checks).pop().__hash__()
 
         return hashed
+
+
+# Read only access to a field of the check (or check group) a client's state
+# belongs to.
+def _definition_field(owner, name):
+    return property(lambda self: getattr(getattr(self, owner), name))
+
+
+# The state a client holds for a check : its status, details and data. Checks
+# are shared among all clients of a monitor, anything else (name, path, id,
+# whether it is enabled, etc.) is read from the check this state belongs to.
+class ClientCheck(CheckStatus):
+
+    __slots__ = ['check', 'current_status', 'previous_status', 'details', 'data']
+
+    id = _definition_field('check', 'id')
+    enabled = _definition_field('check', 'enabled')
+    name = _definition_field('check', 'name')
+    path = _definition_field('check', 'path')
+    args = _definition_field('check', 'args')
+    timeout = _definition_field('check', 'timeout')
+    ttl = _definition_field('check', 'ttl')
+    interval = _definition_field('check', 'interval')
+    type = _definition_field('check', 'type')
+
+    def __init__(self, check):
+        self.check = check
+        self.current_status = check.current_status
+        self.previous_status = check.previous_status
+        self.details = check.details
+        self.data = check.data
+
+    def to_dict(self):
+        d = self.check.to_dict()
+        d.update({
+            'current_status': self.current_status,
+            'previous_status': self.previous_status,
+            'details': self.details,
+            'data': self.data,
+        })
+
+        return d
+
+    def to_check_dict(self):
+        return self.check.to_check_dict()
+
+    def as_list(self):
+        return [self]
+
+    def __eq__(self, other_check):
+        return self.check == other_check
+
+    def __hash__(self):
+        return hash(self.check)
+
+
+# Same as above for check groups, its checks are the client's own ones.
+class ClientCheckGroup(object):
+
+    __slots__ = ['check_group', 'checks']
+
+    id = _definition_field('check_group', 'id')
+    enabled = _definition_field('check_group', 'enabled')
+    name = _definition_field('check_group', 'name')
+
+    def __init__(self, check_group, checks):
+        self.check_group = check_group
+        self.checks = set(checks)
+
+    def update_status(self, check_status):
+        return any([c.update_status(check_status) for c in self.checks])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'enabled': self.enabled,
+            'checks': [c.to_dict() for c in self.checks],
+        }
+
+    def to_check_dict(self):
+        return self.check_group.to_check_dict()
+
+    def as_list(self):
+        return [c for c in self.checks]
+
+    def __eq__(self, other_check_group):
+        return self.check_group == other_check_group
+
+    def __hash__(self):
+        return hash(self.check_group)
@@ -20,11 +20,16 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from Queue import Empty as EmptyQueue
 from threading import Thread, Event
+from select import select
+from multiprocessing.pool import ThreadPool
 from ..check import UnixCheck, WindowsCheck, CheckError
 from ..protocol import Message
 from ..platform_setup import Platform
+from .python_runner import PythonCheckRunner
+from .exec_server import ExecServer
+from .check_cache import CheckCache
+from .check_scheduler import CheckScheduler
 
 
 class CheckManagerError(Exception):
@@ -33,7 +38,6 @@ class CheckManagerError(Exception):
 
 class CheckManager(Thread):
 
-    STOP_EVENT_TIMEOUT = 0.2
     AVAILABLE_PLATFORMS = {
         'UNIX': UnixCheck,
         'Windows': WindowsCheck,
@@ -47,9 +51,17 @@ class CheckManager(Thread):
         self._output_queue = output_queue
         self.stop_event = stop_event or Event()
         self._Check = self._get_platform_check_class()
+        self._check_workers = self._get_check_workers(platform_setup.config['check workers'])
+        self._pool = None
+        self._python_runner = self._build_python_runner(platform_setup.config)
+        self._exec_server = self._build_exec_server(platform_setup.config)
+        self._cache = CheckCache()
+        self._scheduler = CheckScheduler()
+        self._schedule = []
         self._message_actions = {
             Message.TYPE['CHECK']: self._on_check,
             Message.TYPE['TEST']: self._on_test,
+            Message.TYPE['SCHEDULE']: self._on_schedule,
         }
 
     def _get_platform_check_class(self):
@@ -60,18 +72,59 @@ class CheckManager(Thread):
         except KeyError:
             raise CheckManagerError('Error - Platform : \'{:}\' is not available.'.format(platform))
 
+    def _get_check_workers(self, check_workers):
+        if type(check_workers) != int or check_workers < 1:
+            raise CheckManagerError('Error - \'{:}\' is not a valid number of check workers.'.format(check_workers))
+
+        return check_workers
+
+    # Python check workers only switch their owner on Unix.
+    def _build_python_runner(self, config):
+        if Platform.get_platform_type() == 'UNIX':
+            return PythonCheckRunner(self._check_workers, user=config['run as']['user'],
+                                     group=config['run as']['group'])
+
+        return PythonCheckRunner(self._check_workers)
+
+    # The exec server relies on fork, on Windows checks are always spawned
+    # by the client itself.
+    def _build_exec_server(self, config):
+        if config['exec server'] and Platform.get_platform_type() == 'UNIX':
+            return ExecServer(user=config['run as']['user'], group=config['run as']['group'])
+
+        return None
+
     def _build_checks(self, checks):
         try:
-            return [self._Check(name=c['path'], platform_setup=self._platform_setup, **c) for c in checks]
+            return [self._Check(name=c['path'], platform_setup=self._platform_setup, python_runner=self._python_runner,
+                                exec_server=self._exec_server, **c) for c in checks]
         except KeyError:
             raise CheckError('Error - Server sent empty or invalid check.')
 
-    def _on_check(self, message):
-        self._run_checks(self._build_checks(message))
+    # Passive checks are never run, their results are sent to the client.
+    # Every part of a long message is run as soon as it arrives.
+    def _on_check(self, message, last):
+        self._run_checks([c for c in self._build_checks(message) if c.type != 'passive'])
 
     # Yes, is the same as above ! This implementation may change in the future.
-    def _on_test(self, message):
-        self._on_check(message)
+    def _on_test(self, message, last):
+        self._on_check(message, last)
+
+    # The server sends its checks once (and again whenever they change) and
+    # the client runs them on its own at their intervals. A SCHEDULE replaces
+    # the whole schedule, so its parts are collected until the last one.
+    def _on_schedule(self, message, last):
+        self._schedule += message
+
+        if not last:
+            return
+
+        schedule, self._schedule = self._schedule, []
+
+        if any([c.interval is None for c in self._build_checks(schedule)]):
+            raise CheckError('Error - Server sent a scheduled check without interval.')
+
+        self._scheduler.set([c for c in schedule if c.get('type') != 'passive'])
 
     def _log_action(self, message_type, check):
         self._logger.log('{:} from {:}:{:} -> {:}'.format(
@@ -82,11 +135,11 @@ class CheckManager(Thread):
     def _log_incoming_message(self, message_type, message):
         [self._log_action(message_type, check) for check in message]
 
-    def _process_message(self, message_type, message):
+    def _process_message(self, message_type, message, last):
         try:
             self._log_incoming_message(message_type, message)
             action = self._message_actions[message_type]
-            action(message)
+            action(message, last)
         except (KeyError, ValueError):
             self._logger.log('Error - Unknown message id {:}. Message : {:}.'.format(message_type, message))
         except CheckError, e:
@@ -95,14 +148,51 @@ class CheckManager(Thread):
     def is_stopped(self):
         return self.stop_event.is_set()
 
+    # Checks report their own failures, anything else that blows up is logged
+    # and the check is still replied (with an ERROR status) so the server
+    # doesn't wait for it forever.
+    def _on_check_run(self, check):
+        try:
+            self._cache.run(check)
+        except Exception, e:
+            self._logger.log('Error - Unexpected error running check : {:}. Details : {:}.'.format(check.path, e))
+            check.current_status = check.STATUS['ERROR']
+            check.details = str(e)
+
+        self._output_queue.put_nowait([check.to_check_reply_dict()])
+
+    # Checks run concurrently on a pool of threads (checks spend most of their
+    # time waiting for their process to finish). Every reply is sent back as
+    # soon as its check finishes instead of waiting for the slowest one.
     def _run_checks(self, checks):
-        checks_outputs = [c.run().to_check_reply_dict() for c in checks]
-        self._output_queue.put_nowait(checks_outputs)
+        [self._pool.apply_async(self._on_check_run, (c,)) for c in checks]
+
+    # A timed wait on a queue polls, so while checks are scheduled the input
+    # queue (a WakeupQueue) is watched with select until the next one is due.
+    def _get_message(self):
+        timeout = self._scheduler.get_timeout()
+
+        if timeout is not None and not select([self._input_queue], [], [], timeout)[0]:
+            return None
+
+        return self._input_queue.get()
 
+    # Blocks until a message arrives or a scheduled check is due, the
+    # RadarClient writes a None to the queue when it stops.
     def run(self):
+        self._pool = ThreadPool(self._check_workers)
+
         while not self.is_stopped():
-            try:
-                queue_message = self._input_queue.get_nowait()
-                self._process_message(queue_message['message_type'], queue_message['message'])
-            except EmptyQueue:
-                self.stop_event.wait(self.STOP_EVENT_TIMEOUT)
+            queue_message = self._get_message()
+
+            if queue_message is not None:
+                self._process_message(queue_message['message_type'], queue_message['message'],
+                                      queue_message['last'])
+
+            self._run_checks(self._build_checks(self._scheduler.get_due()))
+
+        self._pool.terminate()
+        self._python_runner.stop()
+
+        if self._exec_server is not None:
+            self._exec_server.stop()
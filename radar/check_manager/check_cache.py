@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from threading import Event, Lock
+from time import time
+
+
+# Overlapping polls (or a TEST right after a CHECK) may ask for the same check
+# many times in a short period. Checks are considered the same if they have
+# the same name, path and arguments (see Check.__eq__ and Check.__hash__).
+# Results are reused until their ttl expires and requests for a check that is
+# already running wait for that run instead of starting a new one.
+class CheckCache(object):
+    def __init__(self):
+        self._lock = Lock()
+        self._results = {}
+        self._running = {}
+
+    # Whoever asks for a check decides how old a result it accepts.
+    def _get_result(self, check):
+        finished, result = self._results.get(check, (0, None))
+
+        if finished + check.get_ttl() <= time():
+            return None
+
+        return result
+
+    # Copies the status, details and data of a previous run (keeping the
+    # check's own id).
+    def _apply_result(self, check, result):
+        reply = result.to_check_reply_dict()
+        reply.update({'id': check.id})
+        check.update_status(reply)
+
+        return check
+
+    def _execute(self, check, running):
+        try:
+            check.run()
+        finally:
+            with self._lock:
+                self._results[check] = (time(), check)
+
+                del self._running[check]
+
+            running['done'].set()
+
+        return check
+
+    def _wait(self, check, running):
+        running['done'].wait()
+        return self._apply_result(check, running['check'])
+
+    def run(self, check):
+        with self._lock:
+            result = self._get_result(check)
+            running = self._running.get(check)
+            should_run = result is None and running is None
+
+            if should_run:
+                running = self._running[check] = {'done': Event(), 'check': check}
+
+        if result is not None:
+            return self._apply_result(check, result)
+
+        if should_run:
+            return self._execute(check, running)
+
+        return self._wait(check, running)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from heapq import heapify, heappush, heappop
+from itertools import count
+from time import time
+
+
+# Keeps the checks sent by the server on a SCHEDULE message ordered by the
+# next time they're due. A new schedule replaces the previous one and all of
+# its checks are due right away. If a check falls behind (e.g. all check
+# workers were busy) it's not run repeatedly to catch up, its next run is
+# scheduled one interval after the time it was picked up. Otherwise checks
+# keep their pace and don't drift.
+class CheckScheduler(object):
+    def __init__(self):
+        self._schedule = []
+        self._sequence = count()
+
+    def set(self, checks):
+        now = time()
+        self._schedule = [(now, next(self._sequence), c) for c in checks]
+        heapify(self._schedule)
+
+    def get_timeout(self):
+        if self._schedule:
+            return max(0, self._schedule[0][0] - time())
+
+        return None
+
+    def get_due(self):
+        now = time()
+        due = []
+
+        while self._schedule and self._schedule[0][0] <= now:
+            next_run, _, check = heappop(self._schedule)
+            next_run += check['interval']
+
+            if next_run <= now:
+                next_run = now + check['interval']
+
+            heappush(self._schedule, (next_run, next(self._sequence), check))
+            due.append(check)
+
+        return due
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+# This module runs as a standalone script on its own (small) interpreter. It
+# must only import modules from the standard library.
+
+from binascii import b2a_base64
+from errno import EINTR
+from grp import getgrnam
+from json import loads as deserialize_json, dumps as serialize_json
+from os import devnull, read, getuid, seteuid, setgid, setuid, setgroups, setsid, killpg
+from pwd import getpwnam
+from select import select, error as SelectError
+from signal import SIGKILL
+from subprocess import Popen, PIPE
+from sys import argv, stdin, stdout
+from time import time
+
+
+READ_SIZE = 65536
+
+
+# The helper is started by the client which has only switched its effective
+# user, the real owner is switched here once so checks can't regain the
+# privileges of the client.
+def switch_process_owner(user, group):
+    if getuid() == 0:
+        seteuid(0)
+        setgroups([])
+        setgid(getgrnam(group).gr_gid)
+        setuid(getpwnam(user).pw_uid)
+
+
+def reply(request_id, **kwargs):
+    kwargs.update({'id': request_id})
+    stdout.write(serialize_json(kwargs) + '\n')
+    stdout.flush()
+
+
+class RunningCheck(object):
+    def __init__(self, request):
+        self.id = request['id']
+        self.timeout = request['timeout']
+        self.deadline = time() + self.timeout
+
+        # Standard input is the request pipe, a check reading from it would
+        # steal the requests of other checks.
+        with open(devnull, 'r') as null:
+            self.process = Popen(request['argv'], stdin=null, stdout=PIPE, preexec_fn=setsid, close_fds=True)
+
+        self.fd = self.process.stdout.fileno()
+        self.output = []
+
+    def kill(self):
+        try:
+            killpg(self.process.pid, SIGKILL)
+        except OSError:
+            pass
+
+    def finish(self):
+        self.process.stdout.close()
+        self.process.wait()
+
+
+# If the owner can't be switched the helper keeps running but refuses every
+# check, otherwise the client would restart it over and over.
+class ExecHelper(object):
+    def __init__(self, error=None):
+        self._input = ''
+        self._checks = {}
+        self._error = error
+
+    def _spawn(self, request):
+        if self._error:
+            return reply(request['id'], error=self._error)
+
+        try:
+            check = RunningCheck(request)
+            self._checks[check.fd] = check
+        except OSError, e:
+            reply(request['id'], error='Error - Couldn\'t run : {:} check. Details : {:}'.format(request['argv'], e))
+
+    def _read_requests(self):
+        data = read(stdin.fileno(), READ_SIZE)
+
+        if not data:
+            return False
+
+        lines = (self._input + data).split('\n')
+        self._input = lines.pop()
+        [self._spawn(deserialize_json(l)) for l in lines if l]
+
+        return True
+
+    # Output is sent back base64 encoded so arbitrary bytes survive the trip.
+    def _read_output(self, check):
+        data = read(check.fd, READ_SIZE)
+
+        if data:
+            check.output.append(data)
+        else:
+            del self._checks[check.fd]
+            check.finish()
+            reply(check.id, output=b2a_base64(''.join(check.output)))
+
+    def _expire(self, check):
+        del self._checks[check.fd]
+        check.kill()
+        check.finish()
+        reply(check.id, error='Error - Check didn\'t finish within {:} seconds.'.format(check.timeout), timeout=True)
+
+    def _get_timeout(self):
+        if self._checks:
+            return max(0, min([c.deadline for c in self._checks.values()]) - time())
+
+        return None
+
+    def _watch(self):
+        try:
+            return select([stdin.fileno()] + self._checks.keys(), [], [], self._get_timeout())[0]
+        except SelectError, e:
+            if e[0] != EINTR:
+                raise
+
+        return []
+
+    # Runs until the client closes its end of the pipe, any check that is
+    # still running at that point is killed.
+    def run(self):
+        running = True
+
+        while running:
+            for fd in self._watch():
+                if fd == stdin.fileno():
+                    running = self._read_requests()
+                elif fd in self._checks:
+                    self._read_output(self._checks[fd])
+
+            [self._expire(c) for c in self._checks.values() if c.deadline <= time()]
+
+        [c.kill() for c in self._checks.values()]
+
+
+# Switches to the owner given on the command line (if any). Returns the error
+# every request should be answered with if that isn't possible.
+def switch_owner(argv):
+    try:
+        if len(argv) == 3:
+            switch_process_owner(*argv[1:])
+    except (OSError, KeyError), e:
+        return 'Error - Couldn\'t switch process owner \'{:}.{:}\'. Details : {:}.'.format(argv[1], argv[2], e)
+
+    return None
+
+
+def main():
+    ExecHelper(error=switch_owner(argv)).run()
+
+
+if __name__ == '__main__':
+    main()
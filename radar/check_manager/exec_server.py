@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from binascii import a2b_base64
+from itertools import count
+from json import loads as deserialize_json, dumps as serialize_json
+from os.path import abspath, dirname, join as join_path
+from subprocess import Popen, PIPE
+from sys import executable as python_executable
+from threading import Thread, Event, Lock
+from ..check import CheckError, CheckTimeoutError
+
+
+class ExecServerError(CheckError):
+    pass
+
+
+# Checks are spawned by a helper process instead of the client itself, so
+# every check forks a small interpreter that only holds the standard library
+# instead of the whole client (its threads, configuration, etc). The helper
+# is started the first time a check runs and restarted if it dies. Many
+# checks may be running on the helper at the same time, replies are matched
+# to their requests by id.
+class ExecServer(object):
+
+    HELPER_PATH = join_path(dirname(abspath(__file__)), 'exec_helper.py')
+
+    # Extra seconds (past the check's timeout) the helper has to reply.
+    REPLY_GRACE = 5
+
+    def __init__(self, user=None, group=None):
+        self._owner = [user, group] if user and group else []
+        self._process = None
+        self._pending = {}
+        self._ids = count()
+        self._lock = Lock()
+
+    def _start(self):
+        try:
+            self._process = Popen([python_executable, '-S', self.HELPER_PATH] + self._owner, stdin=PIPE, stdout=PIPE,
+                                  close_fds=True)
+        except OSError, e:
+            raise ExecServerError('Error - Couldn\'t start exec server. Details : {:}.'.format(e))
+
+        self._pending = {}
+        reader = Thread(target=self._read_replies, args=(self._process, self._pending))
+        reader.daemon = True
+        reader.start()
+
+    def _is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _on_reply(self, pending, reply):
+        with self._lock:
+            request = pending.pop(reply['id'], None)
+
+        if request is not None:
+            request['reply'] = reply
+            request['done'].set()
+
+    # Any request still pending when the helper goes away will never get its
+    # reply, so they are all failed. Every helper has its own pending requests
+    # so a new helper is not affected by the one it replaces.
+    def _read_replies(self, process, pending):
+        for line in iter(process.stdout.readline, ''):
+            self._on_reply(pending, deserialize_json(line))
+
+        process.stdout.close()
+        process.wait()
+
+        with self._lock:
+            requests = pending.values()
+            pending.clear()
+
+        for r in requests:
+            r['reply'] = {'error': 'Error - Exec server exited while running the check.'}
+            r['done'].set()
+
+    def _request(self, argv, timeout):
+        with self._lock:
+            if not self._is_running():
+                self._start()
+
+            request_id = next(self._ids)
+            request = {'id': request_id, 'pending': self._pending, 'done': Event(), 'reply': None}
+            self._pending[request_id] = request
+
+            try:
+                self._process.stdin.write(serialize_json({'id': request_id, 'argv': argv, 'timeout': timeout}) + '\n')
+                self._process.stdin.flush()
+            except IOError, e:
+                del self._pending[request_id]
+                raise CheckError('Error - Couldn\'t send check to exec server. Details : {:}.'.format(e))
+
+        return request
+
+    # The helper enforces the check's timeout itself, but a helper that hangs
+    # must not block the caller forever.
+    def _wait(self, request, timeout):
+        if request['done'].wait(timeout + self.REPLY_GRACE):
+            return request['reply']
+
+        with self._lock:
+            request['pending'].pop(request['id'], None)
+
+        raise CheckTimeoutError('Error - Exec server didn\'t reply within {:} seconds.'.format(
+            timeout + self.REPLY_GRACE))
+
+    def run(self, argv, timeout):
+        reply = self._wait(self._request(argv, timeout), timeout)
+
+        if reply.get('timeout', False):
+            raise CheckTimeoutError(reply['error'])
+
+        if 'error' in reply:
+            raise CheckError(reply['error'])
+
+        return a2b_base64(reply['output'])
+
+    def stop(self):
+        with self._lock:
+            if self._is_running():
+                self._process.stdin.close()
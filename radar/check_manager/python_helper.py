@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+# This module runs as a standalone script on its own interpreter, so Python
+# checks don't share the memory, threads or sockets of the client. Unlike the
+# exec helper the site packages are kept as checks may import anything that
+# is installed.
+
+from imp import load_source
+from itertools import count
+from json import loads as deserialize_json, dumps as serialize_json
+from os import devnull, dup, dup2, fdopen, stat, open as open_fd, O_RDWR
+from sys import argv, stdin, stdout, modules as imported_modules
+
+
+# Requests and replies travel on copies of the standard input and output, the
+# originals are pointed to the null device so a careless check can't block on
+# them or garble any reply.
+def redirect_standard_streams():
+    requests = fdopen(dup(stdin.fileno()), 'r')
+    replies = fdopen(dup(stdout.fileno()), 'w')
+    null = open_fd(devnull, O_RDWR)
+    [dup2(null, fd) for fd in (0, 1, 2)]
+
+    return requests, replies
+
+
+# Every check module is imported the first time it is requested and again
+# whenever its file changes, otherwise its run function is called right away.
+class PythonHelper(object):
+    def __init__(self, error=None):
+        self._modules = {}
+        self._loads = count()
+        self._error = error
+
+    def _get_module(self, filename):
+        info = stat(filename)
+        signature = (info.st_mtime, info.st_size)
+        cached = self._modules.get(filename)
+
+        if cached is None or cached[0] != signature:
+            if cached is not None:
+                imported_modules.pop(cached[1].__name__, None)
+
+            cached = (signature, load_source('radar_check_{:}'.format(next(self._loads)), filename))
+            self._modules[filename] = cached
+
+        return cached[1]
+
+    def run(self, request):
+        if self._error:
+            return serialize_json({'error': self._error})
+
+        try:
+            return serialize_json({'output': self._get_module(request['filename']).run(request['args'])})
+        except Exception, e:
+            return serialize_json({
+                'error': 'Error - Python check : {:} failed. Details : {:}.'.format(request['filename'], e)
+            })
+
+
+def main():
+    requests, replies = redirect_standard_streams()
+    error = None
+
+    # An owner is only given on Unix, which is the only platform the exec
+    # helper (and the modules it imports) runs on.
+    if len(argv) == 3:
+        from exec_helper import switch_owner
+        error = switch_owner(argv)
+
+    helper = PythonHelper(error=error)
+
+    for line in iter(requests.readline, ''):
+        replies.write(helper.run(deserialize_json(line)) + '\n')
+        replies.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from json import loads as deserialize_json, dumps as serialize_json
+from os.path import abspath, dirname, join as join_path
+from Queue import Queue, Empty
+from subprocess import Popen, PIPE
+from sys import executable as python_executable
+from threading import Thread
+from ..check import CheckError, CheckTimeoutError
+
+
+# Every worker is a fresh interpreter running the Python helper, so checks
+# don't inherit the memory, threads or sockets of the client and (on Unix)
+# run as the run as user and group. Replies are read on a thread of their
+# own so a run can give up on a worker after its timeout.
+class PythonCheckWorker(object):
+
+    HELPER_PATH = join_path(dirname(abspath(__file__)), 'python_helper.py')
+
+    def __init__(self, owner=None):
+        try:
+            self._process = Popen([python_executable, self.HELPER_PATH] + (owner or []), stdin=PIPE, stdout=PIPE,
+                                  close_fds=True)
+        except OSError, e:
+            raise CheckError('Error - Couldn\'t start Python check worker. Details : {:}.'.format(e))
+
+        self._replies = Queue()
+        reader = Thread(target=self._read_replies)
+        reader.daemon = True
+        reader.start()
+
+    def _read_replies(self):
+        for line in iter(self._process.stdout.readline, ''):
+            self._replies.put(deserialize_json(line))
+
+        self._process.stdout.close()
+        self._replies.put(None)
+
+    def run(self, filename, args, timeout):
+        self._process.stdin.write(serialize_json({'filename': filename, 'args': args}) + '\n')
+        self._process.stdin.flush()
+
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except Empty:
+            raise CheckTimeoutError('Error - Check didn\'t finish within {:} seconds.'.format(timeout))
+
+        if reply is None:
+            raise EOFError('Python check worker exited')
+
+        if 'error' in reply:
+            raise CheckError(reply['error'])
+
+        return reply['output']
+
+    def stop(self):
+        if self._process.poll() is None:
+            self._process.kill()
+
+        self._process.wait()
+        self._process.stdin.close()
+
+
+# Python checks run on a set of long lived worker processes instead of being
+# spawned on every run, this saves the interpreter startup and the module
+# imports. Workers are started the first time they're needed and a worker
+# that times out or dies is replaced by a new one.
+class PythonCheckRunner(object):
+    def __init__(self, workers, user=None, group=None):
+        self._owner = [user, group] if user and group else []
+        self._idle_workers = Queue()
+        [self._idle_workers.put(None) for _ in xrange(workers)]
+
+    def run(self, filename, args, timeout):
+        worker = self._idle_workers.get()
+
+        try:
+            worker = worker or PythonCheckWorker(owner=self._owner)
+            return worker.run(filename, args, timeout)
+        except CheckTimeoutError:
+            worker.stop()
+            worker = None
+            raise
+        except (EOFError, IOError), e:
+            worker.stop()
+            worker = None
+            raise CheckError('Error - Python check worker died while running : {:}. Details : {:}.'.format(
+                filename, e))
+        finally:
+            self._idle_workers.put(worker)
+
+    def stop(self):
+        workers = []
+
+        while not self._idle_workers.empty():
+            workers.append(self._idle_workers.get_nowait())
+
+        [w.stop() for w in workers if w is not None]
@@ -20,12 +20,54 @@ Copyright 2015 Lucas Liendo.
 """
 
 
+from json import loads as deserialize_json
+from socket import socket, AF_INET, SOCK_DGRAM, error as SocketError
 from time import time
-from threading import Thread, Event
-from json import loads as deserialize_json, dumps as serialize_json
+from threading import Thread
 from Queue import Empty as EmptyQueue
+from ..check import Check, CheckError
 from ..network.client import Client
-from ..protocol import Message
+from ..protocol import Message, MessageNotReady
+from ..misc import WakeupEvent
+
+
+class RadarClientError(Exception):
+    pass
+
+
+# Receives results of passive checks (checks that are not run by Radar but
+# by cron jobs, applications, etc) as UDP datagrams. Only local processes
+# are allowed to send them.
+class PassiveCheckListener(object):
+
+    ADDRESS = '127.0.0.1'
+    MAX_DATAGRAM_SIZE = 65507
+
+    def __init__(self, port):
+        try:
+            self.socket = socket(AF_INET, SOCK_DGRAM)
+            self.socket.bind((self.ADDRESS, port))
+            self.socket.setblocking(0)
+        except SocketError, e:
+            raise RadarClientError('Error - Couldn\'t listen for passive checks on {:}:{:}. Details : {:}.'.format(
+                self.ADDRESS, port, e))
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def receive(self):
+        datagrams = []
+
+        try:
+            while True:
+                datagrams.append(self.socket.recv(self.MAX_DATAGRAM_SIZE))
+        except SocketError:
+            pass
+
+        return datagrams
+
+    def close(self):
+        self.socket.close()
 
 
 class RadarClientLite(Client):
@@ -42,10 +84,14 @@ class RadarClientLite(Client):
     def receive_message(self):
         return self._message.receive(self)
 
+    def message_pending(self):
+        return self._message.pending()
+
 
 class RadarClient(RadarClientLite, Thread):
 
-    NETWORK_MONITOR_TIMEOUT = 0.2
+    NETWORK_MONITOR_TIMEOUT = None
+    MAX_REPLIES = 256
     CONNECT_DISCONNECT_INTERVAL = 0.5
     RECONNECT_DELAYS = [5, 15, 60]
 
@@ -60,11 +106,31 @@ class RadarClient(RadarClientLite, Thread):
         )
         self._logger = platform_setup.logger
         self._reconnect = platform_setup.config['reconnect']
+        self._compress = platform_setup.config['compress']
+        self._binary = platform_setup.config['binary encoding']
+        self._reply_window = self._validate_reply_window(platform_setup.config['reply window'])
+        self._passive_listener = self._build_passive_listener(platform_setup.config['passive port'])
+        self._passive_checks = {}
+        self._scheduled_passive_checks = []
+        self._replies = []
+        self._replies_deadline = 0
         self._input_queue = input_queue
         self._output_queue = output_queue
         self._delays = self.RECONNECT_DELAYS
         self._connect_timestamp = 0
-        self.stop_event = stop_event or Event()
+        self.stop_event = stop_event or WakeupEvent()
+
+    def _validate_reply_window(self, reply_window):
+        if type(reply_window) not in [int, float] or reply_window < 0:
+            raise RadarClientError('Error - \'{:}\' is not a valid reply window.'.format(reply_window))
+
+        return reply_window
+
+    def _build_passive_listener(self, port):
+        if port:
+            return PassiveCheckListener(port)
+
+        return None
 
     def _sleep(self):
         self.stop_event.wait(self._delays[0])
@@ -81,7 +147,12 @@ class RadarClient(RadarClientLite, Thread):
         else:
             self.stop_event.wait(self.CONNECT_DISCONNECT_INTERVAL)
 
+    # Anything left in the message buffer belongs to a previous connection,
+    # the same applies to the passive checks we know about.
     def on_connect(self):
+        self._message = Message(compress=self._compress, binary=self._binary)
+        self._passive_checks = {}
+        self._scheduled_passive_checks = []
         self._logger.log('Connected to {:}:{:}.'.format(self.address, self.port))
         self._connect_timestamp = time()
 
@@ -102,26 +173,132 @@ class RadarClient(RadarClientLite, Thread):
                 else:
                     self.stop_event.set()
 
-    def on_receive(self):
-        message_type, message = self.receive_message()
+    def _add_passive_checks(self, checks):
+        for c in [c for c in checks if c.get('type') == 'passive']:
+            self._passive_checks.setdefault(c['path'], set()).add(c['id'])
+
+    # Passive checks are defined on the server as any other check, their ids
+    # are learned from the messages that carry them. A SCHEDULE replaces all
+    # of them, as it may arrive in parts they're only replaced once its last
+    # part is received.
+    def _learn_passive_checks(self, message_type, message, last):
+        if message_type != Message.TYPE['SCHEDULE']:
+            return self._add_passive_checks(message)
+
+        self._scheduled_passive_checks += [c for c in message if c.get('type') == 'passive']
+
+        if last:
+            self._passive_checks = {}
+            self._add_passive_checks(self._scheduled_passive_checks)
+            self._scheduled_passive_checks = []
+
+    def _enqueue_message(self):
+        message_type, message, last = self.receive_message()
+        self._learn_passive_checks(message_type, message, last)
         self._output_queue.put_nowait({
             'message_type': message_type,
-            'message': deserialize_json(message),
+            'message': message,
+            'last': last,
         })
 
-    def on_timeout(self):
+    # A single read may bring in more than one message, all of them are
+    # processed before going back to watch the socket.
+    def on_receive(self):
         try:
-            serialized_message = serialize_json(self._input_queue.get_nowait())
-            self.send_message(Message.TYPE['CHECK REPLY'], serialized_message)
+            self._enqueue_message()
+
+            while self.message_pending():
+                self._enqueue_message()
+        except MessageNotReady:
+            pass
+
+        self._send_replies()
+
+    def _get_replies(self):
+        replies = []
+
+        try:
+            while True:
+                replies += self._input_queue.get_nowait()
         except EmptyQueue:
             pass
 
+        return replies
+
+    # The input queue and the stop event are watched along with the socket, so
+    # replies are noticed as soon as checks finish and the client sleeps until
+    # there's something to do.
+    def _get_read_fds(self):
+        read_fds = [self.socket, self._input_queue, self.stop_event]
+
+        if self._passive_listener:
+            read_fds.append(self._passive_listener)
+
+        return read_fds
+
+    def _get_watch_timeout(self):
+        if self._replies:
+            return max(0, self._replies_deadline - time())
+
+        return self.network_monitor_timeout
+
+    def _add_replies(self, replies):
+        if replies and not self._replies:
+            self._replies_deadline = time() + self._reply_window
+
+        self._replies += replies
+
+    def _collect_replies(self):
+        self._add_replies(self._get_replies())
+
+    # A passive check result is a JSON just like the output of any check plus
+    # a check field holding the path of the check as defined on the server.
+    def _parse_passive_result(self, datagram):
+        try:
+            result = deserialize_json(datagram)
+            path = result['check']
+            ids = self._passive_checks[path]
+            reply = Check(id=min(ids), name=path, path=path)._parse_output(result)
+        except (ValueError, TypeError, KeyError, CheckError), e:
+            self._logger.log('Error - Invalid or unknown passive check result : {:}. Details : {:}.'.format(
+                datagram, e))
+            return []
+
+        return [dict(reply, id=i) for i in ids]
+
+    def _receive_passive_results(self):
+        if self._passive_listener:
+            [self._add_replies(self._parse_passive_result(d)) for d in self._passive_listener.receive()]
+
+    # Check replies arrive one by one as checks finish. Replies that arrive
+    # within the reply window (starting at the first one) are coalesced and
+    # sent together, at most MAX_REPLIES per message.
+    def _send_replies(self):
+        self._collect_replies()
+
+        if self._replies and (time() >= self._replies_deadline or len(self._replies) >= self.MAX_REPLIES):
+            replies, self._replies = self._replies, []
+            [self.send_message(Message.TYPE['CHECK REPLY'], replies[n:n + self.MAX_REPLIES])
+             for n in xrange(0, len(replies), self.MAX_REPLIES)]
+
+    def on_timeout(self):
+        self._receive_passive_results()
+        self._send_replies()
+
     def is_stopped(self):
         return self.stop_event.is_set()
 
+    # The CheckManager blocks reading its queue, a None is written to it to
+    # wake it up when the client stops.
     def run(self):
-        self.connect()
-
-        while not self.is_stopped():
-            super(RadarClient, self).run()
+        try:
             self.connect()
+
+            while not self.is_stopped():
+                super(RadarClient, self).run()
+                self.connect()
+        finally:
+            self._output_queue.put_nowait(None)
+
+            if self._passive_listener:
+                self._passive_listener.close()
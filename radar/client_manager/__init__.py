@@ -20,34 +20,124 @@ Copyright 2015 Lucas Liendo.
 """
 
 
+from bisect import bisect_right
+from functools import reduce
+from itertools import groupby
+from socket import inet_aton, error as SocketError
+from struct import unpack
 from ..protocol import Message
 from ..check import Check
+from ..misc import Address
+from ..network.client import ClientSendError
+
+
+# Maps addresses to the monitors watching them. The address ranges of all
+# monitors are split into sorted non overlapping segments, each one holding
+# every monitor that covers it, so the monitors of an address are found with
+# a binary search. The index is built along with the monitors.
+class MonitorIndex(object):
+    def __init__(self, monitors):
+        self._bounds = []
+        self._segments = []
+        self._build(monitors)
+
+    def _build(self, monitors):
+        events = []
+        active = {}
+
+        for i, monitor in enumerate(monitors):
+            for first, last in [a.to_range() for a in monitor.addresses]:
+                events += [(first, i, 1), (last + 1, i, -1)]
+
+        for bound, bound_events in groupby(sorted(events), key=lambda e: e[0]):
+            for _, i, delta in bound_events:
+                active[i] = active.get(i, 0) + delta
+
+                if not active[i]:
+                    del active[i]
+
+            self._bounds.append(bound)
+            self._segments.append(tuple([monitors[i] for i in sorted(active)]))
+
+    @staticmethod
+    def _to_int(address):
+        try:
+            return unpack('!I', inet_aton(address))[0]
+        except (SocketError, TypeError):
+            return Address(address).n
+
+    def get(self, address):
+        segment = bisect_right(self._bounds, self._to_int(address)) - 1
+        return self._segments[segment] if segment >= 0 else ()
 
 
 class ClientManager(object):
     def __init__(self, server_setup):
         self._monitors = server_setup.monitors
+        self._index = MonitorIndex(self._monitors)
         self._logger = server_setup.logger
+        self._push_mode = server_setup.config['push mode']
+        self._polling_time = server_setup.config['polling time']
+        self._schedules = {}
         self._message_actions = {
             Message.TYPE['CHECK REPLY']: self._on_check_reply,
             Message.TYPE['TEST REPLY']: self._on_test_reply,
         }
 
+    # Only monitors whose addresses include the client's one are considered.
+    def _get_monitors(self, client):
+        return self._index.get(client.address)
+
     def matches_any_monitor(self, client):
-        return any([m.matches(client) for m in self._monitors])
+        return any([m.matches(client) for m in self._get_monitors(client)])
 
     def _update_checks(self, client, statuses):
-        updated_checks = [m.update_checks(client, statuses) for m in self._monitors if m.enabled]
+        updated_checks = [m.update_checks(client, statuses) for m in self._get_monitors(client) if m.enabled]
         return [uc for uc in updated_checks if uc]
 
+    # A client may be watched by more than one monitor, its schedule holds the
+    # checks of all of them. Checks that don't set their own interval run
+    # every polling time.
+    def _build_schedule(self, client):
+        monitors = [m for m in self._get_monitors(client) if m.enabled and m.has_client(client)]
+        schedule = reduce(lambda l, m: l + m, [m.schedule() for m in monitors], [])
+        [c.setdefault('interval', self._polling_time) for c in schedule]
+
+        return schedule
+
+    # The schedule is only sent if it changed since the last time it was sent
+    # to that client.
+    def _send_schedule(self, client):
+        schedule = self._build_schedule(client)
+
+        if schedule != self._schedules.get(client):
+            try:
+                client.send_message(Message.TYPE['SCHEDULE'], schedule)
+                self._schedules[client] = schedule
+            except ClientSendError, e:
+                self._logger.log('Error - Couldn\'t send schedule to {:}:{:}. Details : {:}.'.format(
+                    client.address, client.port, e))
+
     def register(self, client):
-        [m.add_client(client) for m in self._monitors]
+        [m.add_client(client) for m in self._get_monitors(client)]
+
+        if self._push_mode:
+            self._send_schedule(client)
 
     def unregister(self, client):
-        [m.remove_client(client) for m in self._monitors]
+        [m.remove_client(client) for m in self._get_monitors(client)]
+        self._schedules.pop(client, None)
+
+    def _get_clients(self):
+        return reduce(lambda l, m: l + m, [m.get_clients() for m in self._monitors], [])
 
+    # On push mode clients run their checks on their own, polling only sends
+    # schedules that changed (e.g. a check got disabled).
     def poll(self, message_type=Message.TYPE['CHECK']):
-        [m.poll(message_type) for m in self._monitors if m.enabled]
+        if self._push_mode:
+            [self._send_schedule(c) for c in set(self._get_clients())]
+        else:
+            [m.poll(message_type) for m in self._monitors if m.enabled]
 
     def _log_reply(self, client, message_type, check):
         check['status'] = Check.get_status(check['status'])
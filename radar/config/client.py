@@ -47,6 +47,14 @@ class ClientConfig(ConfigBuilder):
 
         'enforce ownership': True,
         'reconnect': True,
+        'check workers': 8,
+        'check timeout': 60,
+        'cache ttl': 0,
+        'exec server': True,
+        'reply window': 0.05,
+        'passive port': 0,
+        'compress': False,
+        'binary encoding': False,
     }
 
     def __init__(self, path=None):
@@ -223,6 +223,11 @@ class ServerConfig(ConfigBuilder):
         },
 
         'polling time': 300,
+        'push mode': False,
+        'engine': 'threads',
+        'workers': 2,
+        'edge triggered': False,
+        'max accepts': 128,
     }
 
     def __init__(self, path=None):
@@ -33,6 +33,9 @@ class ContactGroupError(Exception):
 
 
 class Contact(Switchable):
+
+    __slots__ = ['name', 'email', 'phone']
+
     def __init__(self, id=None, name='', email='', phone='', enabled=True):
         super(Contact, self).__init__(id=id, enabled=enabled)
 
@@ -58,6 +61,9 @@ class Contact(Switchable):
 
 
 class ContactGroup(Switchable):
+
+    __slots__ = ['name', 'contacts']
+
     def __init__(self, name='', contacts=[], enabled=True):
         super(ContactGroup, self).__init__(enabled=enabled)
 
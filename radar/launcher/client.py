@@ -20,12 +20,11 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from Queue import Queue
-from threading import Event
 from . import RadarLauncher
 from ..platform_setup.client import UnixClientSetup, WindowsClientSetup
 from ..check_manager import CheckManager
 from ..client import RadarClient
+from ..misc import WakeupQueue, WakeupEvent
 
 
 class RadarClientLauncher(RadarLauncher):
@@ -44,8 +43,8 @@ class RadarClientLauncher(RadarLauncher):
     # TODO: Need better queue names (or maybe use a custom bidirectional alternative
     # such as a Channel abstraction).
     def _build_threads(self):
-        queue_a, queue_b = Queue(), Queue()
-        stop_event = Event()
+        queue_a, queue_b = WakeupQueue(), WakeupQueue()
+        stop_event = WakeupEvent()
 
         return [
             RadarClient(self._platform_setup, queue_a, queue_b, stop_event=stop_event),
@@ -22,9 +22,10 @@ Copyright 2015 Lucas Liendo.
 
 from Queue import Queue
 from threading import Event
-from . import RadarLauncher
+from multiprocessing import Queue as ProcessQueue, Event as ProcessEvent
+from . import RadarLauncher, RadarLauncherError
 from ..client_manager import ClientManager
-from ..server import RadarServer, RadarServerPoller
+from ..server import RadarServer, RadarServerPoller, RadarEventLoopServer, RadarServerWorker
 from ..platform_setup.server import UnixServerSetup, WindowsServerSetup
 from ..plugin import PluginManager
 
@@ -40,7 +41,20 @@ class RadarServerLauncher(RadarLauncher):
 
     def __init__(self):
         super(RadarServerLauncher, self).__init__()
-        self._threads = self._build_threads()
+        self._engines = {
+            'threads': self._build_threads,
+            'event loop': self._build_event_loop,
+            'processes': self._build_processes,
+        }
+        self._threads = self._build_engine(self._platform_setup.config['engine'])
+
+    def _build_engine(self, engine):
+        try:
+            build = self._engines[engine]
+        except KeyError:
+            raise RadarLauncherError('Error - Engine : \'{:}\' is not available.'.format(engine))
+
+        return build()
 
     def _build_threads(self):
         client_manager = ClientManager(self._platform_setup)
@@ -53,6 +67,39 @@ class RadarServerLauncher(RadarLauncher):
             PluginManager(self._platform_setup, queue, stop_event=stop_event),
         ]
 
+    # The poller and the plugin manager are not started as threads, the
+    # event loop server drives both of them.
+    def _build_event_loop(self):
+        client_manager = ClientManager(self._platform_setup)
+        stop_event = Event()
+
+        return [
+            RadarEventLoopServer(
+                client_manager, self._platform_setup,
+                RadarServerPoller(client_manager, self._platform_setup, stop_event=stop_event),
+                PluginManager(self._platform_setup, None, stop_event=stop_event),
+                stop_event=stop_event
+            ),
+        ]
+
+    def _get_workers(self):
+        workers = self._platform_setup.config['workers']
+
+        if type(workers) != int or workers < 1:
+            raise RadarLauncherError('Error - \'{:}\' is not a valid number of workers.'.format(workers))
+
+        return workers
+
+    # Workers are started before the PluginManager, so they get forked from
+    # a process that has no other running threads.
+    def _build_processes(self):
+        queue = ProcessQueue()
+        stop_event = ProcessEvent()
+        workers = [RadarServerWorker(self._platform_setup, queue, stop_event=stop_event)
+                   for _ in xrange(self._get_workers())]
+
+        return workers + [PluginManager(self._platform_setup, queue, stop_event=stop_event)]
+
     def _start_and_join_threads(self):
         self._start_threads(self._threads[:1])
 
@@ -21,8 +21,15 @@ Copyright 2015 Lucas Liendo.
 
 
 from re import compile as compile_re
-from socket import gethostbyname
+from socket import gethostbyname, socket, create_connection, AF_INET, SOCK_STREAM, error as SocketError
 from abc import ABCMeta
+from Queue import Queue
+from threading import Event
+
+try:
+    from socket import socketpair
+except ImportError:
+    socketpair = None
 
 
 class AddressError(Exception):
@@ -30,6 +37,9 @@ class AddressError(Exception):
 
 
 class Address(object):
+
+    __slots__ = ['ip', 'n']
+
     def __init__(self, address):
         self.ip = self._validate(address.strip())
         self.n = self._to_int()
@@ -37,6 +47,9 @@ class Address(object):
     def to_dict(self):
         return {'address': self.ip}
 
+    def to_range(self):
+        return self.n, self.n
+
     def _resolve_hostname(self, hostname):
         try:
             return gethostbyname(hostname)
@@ -72,6 +85,9 @@ class Address(object):
 
 
 class AddressRange(object):
+
+    __slots__ = ['start_ip', 'end_ip']
+
     def __init__(self, address_range):
         self.start_ip, self.end_ip = self._validate(address_range.strip())
 
@@ -81,6 +97,9 @@ class AddressRange(object):
             'end address': self.end_ip.ip,
         }
 
+    def to_range(self):
+        return self.start_ip.n, self.end_ip.n
+
     def _validate(self, address_range):
         start_ip, end_ip = [Address(a) for a in address_range.split('-', 1)]
 
@@ -122,11 +141,15 @@ class SequentialIdGenerator(object):
 
 
 # Mixin used heavily on server side. It provides a unique id and a silly
-# enable/disable behaviour.
+# enable/disable behaviour. Lots of these objects are held by the server, so
+# they keep their attributes in slots instead of a per instance dict (every
+# subclass should declare its own slots, otherwise instances get a dict back).
 class Switchable(object):
 
     __metaclass__ = ABCMeta
 
+    __slots__ = ['id', 'enabled']
+
     def __init__(self, id=None, enabled=True):
         self.id = id or SequentialIdGenerator().generate()
         self.enabled = enabled
@@ -139,3 +162,78 @@ class Switchable(object):
 
     def to_dict(self, attrs):
         return {a: getattr(self, a) for a in attrs}
+
+
+# On platforms lacking socketpair (Windows) a loopback connection is used.
+def _build_socket_pair():
+    if socketpair is not None:
+        reader, writer = socketpair()
+    else:
+        listen_socket = socket(AF_INET, SOCK_STREAM)
+        listen_socket.bind(('127.0.0.1', 0))
+        listen_socket.listen(1)
+        writer = create_connection(listen_socket.getsockname())
+        reader, _ = listen_socket.accept()
+        listen_socket.close()
+
+    reader.setblocking(0)
+    writer.setblocking(0)
+
+    return reader, writer
+
+
+# A queue that can be watched using select : its fileno is readable as long
+# as the queue holds items. This allows a thread to wait for incoming network
+# data and queued items at the same time.
+class WakeupQueue(Queue):
+    def __init__(self, maxsize=0):
+        Queue.__init__(self, maxsize)
+        self._reader, self._writer = _build_socket_pair()
+
+    # Both _put and _get are called holding the queue's mutex, so a single
+    # byte is pending on the socket pair only while the queue is not empty.
+    def _put(self, item):
+        Queue._put(self, item)
+
+        if len(self.queue) == 1:
+            self._writer.send('\0')
+
+    def _get(self):
+        item = Queue._get(self)
+
+        if not self.queue:
+            self._clear()
+
+        return item
+
+    def _clear(self):
+        try:
+            self._reader.recv(1)
+        except SocketError:
+            pass
+
+    def fileno(self):
+        return self._reader.fileno()
+
+
+# An event that can be watched using select : its fileno becomes readable once
+# the event is set, so a thread waiting on sockets notices it immediately.
+class WakeupEvent(object):
+    def __init__(self):
+        self._event = Event()
+        self._reader, self._writer = _build_socket_pair()
+
+    def set(self):
+        if not self._event.is_set():
+            self._event.set()
+            self._writer.send('\0')
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def fileno(self):
+        return self._reader.fileno()
+
@@ -20,10 +20,9 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from json import dumps as serialize_json
-from copy import deepcopy
 from functools import reduce
-from ..misc import Switchable
+from ..misc import Switchable, Address
+from ..check import CheckError, CheckGroup, ClientCheck, ClientCheckGroup
 from ..network.client import ClientSendError
 
 
@@ -31,6 +30,57 @@ class MonitorError(Exception):
     pass
 
 
+# State a monitor keeps for each of its connected clients. Checks and contacts
+# are shared by all clients, a client only owns the status of its checks, which
+# is allocated the first time the client replies for a check. Until then the
+# check itself (with an unknown status) stands for the client's one.
+class ActiveClient(object):
+
+    __slots__ = ['client', 'checks', 'contacts', '_checks', '_check_groups']
+
+    def __init__(self, client, checks, contacts):
+        self.client = client
+        self.checks = checks
+        self.contacts = contacts
+        self._checks = {}
+        self._check_groups = {}
+
+    def get_check(self, check):
+        client_check = self._checks.get(check.id)
+
+        if client_check is None:
+            client_check = self._checks[check.id] = ClientCheck(check)
+
+        return client_check
+
+    # Check groups hold the client's own checks.
+    def get_check_group(self, check_group):
+        client_check_group = self._check_groups.get(check_group.id)
+
+        if client_check_group is None:
+            client_check_group = self._check_groups[check_group.id] = ClientCheckGroup(
+                check_group, [self.get_check(c) for c in check_group.checks])
+
+        return client_check_group
+
+    def get(self, item):
+        return self.get_check_group(item) if isinstance(item, CheckGroup) else self.get_check(item)
+
+    def _lookup(self, item):
+        states = self._check_groups if isinstance(item, CheckGroup) else self._checks
+        return states.get(item.id, item)
+
+    def to_dict(self):
+        return {
+            'address': self.client.address,
+            'checks': [self._lookup(c).to_dict() for c in self.checks],
+            'contacts': [c.to_dict() for c in self.contacts],
+        }
+
+
+# Active clients are indexed by their address (clients are considered equal
+# if their addresses are), so looking up, adding and removing a client does
+# not depend on the number of connected clients.
 class Monitor(Switchable):
     def __init__(self, name='', addresses=[], checks=[], contacts=[], enabled=True):
         super(Monitor, self).__init__(enabled=enabled)
@@ -38,8 +88,9 @@ class Monitor(Switchable):
         self.addresses = set(addresses)
         self.checks = set(checks)
         self.contacts = set(contacts)
-        self.active_clients = []
+        self.active_clients = {}
         self._validate()
+        self._checks_by_id = {c.id: (c, item) for item in self.checks for c in item.as_list()}
 
     def _validate(self):
         try:
@@ -48,73 +99,79 @@ class Monitor(Switchable):
         except IndexError:
             pass
 
+    def has_client(self, client):
+        return client.address in self.active_clients
+
+    # The client's address is converted only once, not on every comparison.
     def matches(self, new_client):
-        return (new_client not in [c['client'] for c in self.active_clients]) and \
-            any([new_client.address in a for a in self.addresses])
+        if self.has_client(new_client):
+            return False
+
+        address = Address(new_client.address)
+        return any([address in a for a in self.addresses])
 
     def add_client(self, client):
         added = False
 
         if self.matches(client):
-            self.active_clients.append({
-                'client': client,
-                'checks': deepcopy(self.checks),
-                'contacts': deepcopy(self.contacts),
-            })
+            self.active_clients[client.address] = ActiveClient(client, self.checks, self.contacts)
             added = True
 
         return added
 
     def remove_client(self, client):
-        removed = False
-        pre_remove_clients_count = len(self.active_clients)
+        return self.active_clients.pop(client.address, None) is not None
 
-        self.active_clients = [c for c in self.active_clients if c['client'] != client]
+    def _update_check(self, active_client, status):
+        try:
+            check, item = self._checks_by_id.get(status['id'], (None, None))
+        except KeyError:
+            raise CheckError('Error - Can\'t update check\'s status. Missing id and/or status from check reply.')
 
-        if len(self.active_clients) < pre_remove_clients_count:
-            removed = True
+        if check is None or not active_client.get_check(check).update_status(status):
+            return None
 
-        return removed
+        return active_client.get(item)
 
+    # Every status is applied to the client's check with the same id. Updated
+    # checks are reported as they were defined (a check or a check group).
     def update_checks(self, client, statuses):
         updated = {}
+        active_client = self.active_clients.get(client.address)
 
-        try:
-            active_client = [c for c in self.active_clients if c['client'] == client].pop()
-            updated_checks = [c for c in active_client['checks'] for s in statuses if c.update_status(s)]
+        if active_client is not None:
+            updated_checks = set([self._update_check(active_client, s) for s in statuses])
+            updated_checks.discard(None)
 
             if updated_checks:
-                updated['checks'] = set(updated_checks)
-                updated['contacts'] = set([c for c in active_client['contacts'] if c.enabled])
-        except IndexError:
-            pass
+                updated['checks'] = updated_checks
+                updated['contacts'] = set([c for c in active_client.contacts if c.enabled])
 
         return updated
 
     def _poll_client(self, client, message_type, message):
         try:
-            client.send_message(message_type, serialize_json(message))
+            client.send_message(message_type, message)
         except ClientSendError:
             # TODO: We should log this error.
             pass
 
     def poll(self, message_type):
         message = reduce(lambda l, m: l + m, [c.to_check_dict() for c in self.checks if c.enabled])
-        [self._poll_client(c['client'], message_type, message) for c in self.active_clients]
+        [self._poll_client(c.client, message_type, message) for c in self.active_clients.values()]
 
         return message
 
-    def _active_client_to_dict(self, active_client):
-        return {
-            'address': active_client['client'].address,
-            'checks': [c.to_dict() for c in active_client['checks']],
-            'contacts': [c.to_dict() for c in active_client['contacts']],
-        }
+    def get_clients(self):
+        return [c.client for c in self.active_clients.values()]
+
+    def schedule(self):
+        return reduce(lambda l, m: l + m, [c.to_check_dict() for c in self.checks if c.enabled], [])
 
     def to_dict(self):
         d = super(Monitor, self).to_dict(['id', 'name', 'enabled'])
         d.update({
-            'clients': [self._active_client_to_dict(c) for c in self.active_clients]
+            'clients': [c.to_dict() for c in self.active_clients.values()]
         })
 
         return d
@@ -21,6 +21,8 @@ Copyright 2015 Lucas Liendo.
 
 
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from threading import RLock
 from socket import create_connection, SOL_SOCKET, SO_LINGER, error as SocketError
 from select import select, error as SelectError
 from struct import pack
@@ -47,6 +49,10 @@ class ClientDataNotReady(Exception):
     pass
 
 
+class ClientSendNotReady(Exception):
+    pass
+
+
 class ClientAbortError(Exception):
     pass
 
@@ -55,12 +61,20 @@ class Client(object):
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, address, port, socket=None, network_monitor_timeout=None, blocking_socket=True):
+    def __init__(self, address, port, socket=None, network_monitor_timeout=None, blocking_socket=True,
+                 network_monitor=None):
         self.address = address
         self.port = port
         self.socket = socket
         self.network_monitor_timeout = network_monitor_timeout
         self.blocking_socket = blocking_socket
+        self.network_monitor = network_monitor
+        self._outgoing = deque()
+        self._outgoing_offset = 0
+        # Held while writing and while disconnecting, so data is never queued
+        # (nor the network monitor told about it) for a socket that is being
+        # closed. Owners of the client may hold it while disconnecting it.
+        self.write_lock = RLock()
 
     def connect(self):
         if self.is_connected():
@@ -74,23 +88,29 @@ class Client(object):
         self.on_connect()
 
     def disconnect(self):
-        if not self.is_connected():
-            raise ClientError('Error - Client is not connected.')
+        with self.write_lock:
+            if not self.is_connected():
+                raise ClientError('Error - Client is not connected.')
+
+            self.socket.close()
+            self.socket = None
+            self._discard_outgoing()
 
-        self.socket.close()
-        self.socket = None
         self.on_disconnect()
 
     # Despite its name this method performs a TCP connection reset.
     def abort(self):
-        if not self.is_connected():
-            raise ClientError('Error - Client is not connected.')
-
-        # Second parameter of pack means set on linger, the third parametern is
-        # the linger timeout (0 in this case).
-        self.socket.setsockopt(SOL_SOCKET, SO_LINGER, pack('ii', 1, 0))
-        self.socket.close()
-        self.socket = None
+        with self.write_lock:
+            if not self.is_connected():
+                raise ClientError('Error - Client is not connected.')
+
+            # Second parameter of pack means set on linger, the third parametern is
+            # the linger timeout (0 in this case).
+            self.socket.setsockopt(SOL_SOCKET, SO_LINGER, pack('ii', 1, 0))
+            self.socket.close()
+            self.socket = None
+            self._discard_outgoing()
+
         self.on_abort()
 
     def _would_block(self, error_code):
@@ -103,13 +123,61 @@ class Client(object):
     def send(self, data):
         try:
             sent_bytes = self.socket.send(data)
-        except SocketError, (_, e):
+        except SocketError, (error_code, e):
+            if self._would_block(error_code):
+                raise ClientSendNotReady('Error - Non blocking socket send buffer is full.')
+
             raise ClientSendError('Error - Couldn\'t send data. Details : {:}.'.format(e))
         except TypeError:
             raise ClientSendError('Error - Couldn\'t send data (data not iterable).')
 
         return sent_bytes
 
+    def _discard_outgoing(self):
+        with self.write_lock:
+            self._outgoing.clear()
+            self._outgoing_offset = 0
+
+    # Sends as much queued data as the socket accepts without blocking.
+    def _flush(self):
+        try:
+            while self._outgoing:
+                data = self._outgoing[0]
+                self._outgoing_offset += self.send(buffer(data, self._outgoing_offset))
+
+                if self._outgoing_offset == len(data):
+                    self._outgoing.popleft()
+                    self._outgoing_offset = 0
+        except ClientSendNotReady:
+            pass
+
+    # Data is queued and sent right away as long as the socket accepts it, so
+    # a slow peer never blocks the sender. Whatever is left is sent once the
+    # network monitor reports the socket as writable. This may be called from
+    # a thread other than the one watching the socket.
+    def write(self, data):
+        with self.write_lock:
+            if not self.is_connected():
+                raise ClientSendError('Error - Client is not connected.')
+
+            self._outgoing.append(data)
+            self._flush()
+
+            if self._outgoing and self.network_monitor:
+                self.network_monitor.on_write_pending(self)
+
+        return len(data)
+
+    def flush(self):
+        with self.write_lock:
+            self._flush()
+
+            if not self._outgoing and self.network_monitor:
+                self.network_monitor.on_write_done(self)
+
+    def write_pending(self):
+        return len(self._outgoing) > 0
+
     def receive(self, length):
         try:
             received_bytes = self.socket.recv(length)
@@ -125,6 +193,21 @@ class Client(object):
 
         return received_bytes
 
+    def receive_into(self, buffer):
+        try:
+            received_bytes = self.socket.recv_into(buffer)
+        except SocketError, (error_code, error_details):
+            if self._would_block(error_code):
+                raise ClientDataNotReady('Error - Non blocking socket attempting read ahead.')
+
+            raise ClientReceiveError('Error - Couldn\'t receive data from {:}:{:}. Details : {:}.'.format(
+                self.address, self.port, error_details))
+
+        if received_bytes == 0:
+            raise ClientDisconnected()
+
+        return received_bytes
+
     def on_connect(self):
         pass
 
@@ -166,22 +249,43 @@ class Client(object):
         except ClientDisconnected:
             self.disconnect()
 
+    def _flush_pending(self):
+        try:
+            self.flush()
+        except ClientSendError, error:
+            self.on_send_error(error)
+
+    # Subclasses may watch other file descriptors (besides the socket) and
+    # shorten the time spent waiting for them.
+    def _get_read_fds(self):
+        return [self.socket]
+
+    def _get_watch_timeout(self):
+        return self.network_monitor_timeout
+
     def _watch(self):
-        ready_fds = []
+        ready_fds = writable_fds = []
+        write_fds = [self.socket] if self.write_pending() else []
 
         try:
-            ready_fds, _, _ = select([self.socket], [], [], self.network_monitor_timeout)
+            ready_fds, writable_fds, _ = select(self._get_read_fds(), write_fds, [], self._get_watch_timeout())
         except SelectError, e:
             if not self._interrupted_by_signal(e):
                 raise e
 
-        return ready_fds
+        return ready_fds, writable_fds
 
     def run(self):
         while (not self.is_stopped()) and self.is_connected():
-            ready_fds = self._watch()
+            ready_fds, writable_fds = self._watch()
+
+            if writable_fds:
+                self._flush_pending()
+
+            if not self.is_connected():
+                break
 
-            if ready_fds:
+            if self.socket in ready_fds:
                 self._process_message()
             else:
                 self.on_timeout()
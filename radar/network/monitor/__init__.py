@@ -21,6 +21,7 @@ Copyright 2015 Lucas Liendo.
 
 
 from abc import ABCMeta, abstractmethod
+from socket import error as SocketError
 
 
 class NetworkMonitorError(Exception):
@@ -35,40 +36,82 @@ class NetworkMonitor(object):
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, server, timeout=None):
+    EDGE_TRIGGERED_SUPPORT = False
+
+    def __init__(self, server, timeout=None, edge_triggered=False):
         self._server = server
         self._timeout = timeout
+        self._clients = {}
+        self._writers = set()
+        self.edge_triggered = edge_triggered and self.EDGE_TRIGGERED_SUPPORT
 
     def _client_arrived(self, fds):
         return self._server.socket.fileno() in fds
 
-    def _client_ready(self, client, fds):
-        return client.socket.fileno() in fds
-
+    # Every monitor keeps a fileno -> client registry, so dispatching ready
+    # clients costs as much as the number of ready fds and not the number of
+    # connected clients.
     def _ready_clients(self, fds):
-        return [c for c in self._server._clients if self._client_ready(c, fds)]
+        return [self._clients[fd] for fd in fds if fd in self._clients]
 
-    def _watch(self, fds):
+    # Pending writes are flushed before serving readable clients, a client
+    # that gets disconnected while flushing is no longer in the registry.
+    def _watch(self, fds, writable_fds=[]):
         if self._client_arrived(fds):
-            client = self._server._accept()
             fds.remove(self._server.socket.fileno())
+            self._server._accept_clients()
 
-            if self._server.accept_client(client):
-                self._server._on_connect(client)
-            else:
-                self._server._on_reject(client)
-
+        self._server._flush_clients(self._ready_clients(writable_fds))
         self._server._serve_ready_clients(self._ready_clients(fds))
 
-        if not fds:
+        if not fds and not writable_fds:
             self._server.on_timeout()
 
     def on_connect(self, client):
-        pass
+        self._clients[client.socket.fileno()] = client
 
     def on_disconnect(self, client):
+        del self._clients[client.socket.fileno()]
+        self._writers.discard(client.socket.fileno())
+
+    def _register_writer(self, client):
+        pass
+
+    def _unregister_writer(self, client):
         pass
 
+    def _get_fd(self, client):
+        try:
+            return client.socket.fileno()
+        except (AttributeError, SocketError):
+            return None
+
+    # Clients are only watched for writability while they have data that
+    # couldn't be sent yet. These are called while holding the client's write
+    # lock and possibly from a thread other than the server's one. A client
+    # that is being disconnected (its socket may already be closed or gone)
+    # is simply not watched.
+    def on_write_pending(self, client):
+        fd = self._get_fd(client)
+
+        if (fd in self._clients) and (fd not in self._writers):
+            try:
+                self._register_writer(client)
+                self._writers.add(fd)
+            except (IOError, OSError, ValueError, SocketError):
+                pass
+
+    def on_write_done(self, client):
+        fd = self._get_fd(client)
+
+        if fd in self._writers:
+            self._writers.discard(fd)
+
+            try:
+                self._unregister_writer(client)
+            except (IOError, OSError, ValueError, SocketError):
+                pass
+
     @abstractmethod
     def watch(self):
         pass
@@ -24,10 +24,13 @@ from . import NetworkMonitor, NetworkMonitorError
 
 
 class EPollMonitor(NetworkMonitor):
+
+    EDGE_TRIGGERED_SUPPORT = True
+
     def __new__(cls, *args, **kwargs):
         try:
-            global epoll, EPOLLIN
-            from select import epoll, EPOLLIN
+            global epoll, EPOLLIN, EPOLLOUT, EPOLLET
+            from select import epoll, EPOLLIN, EPOLLOUT, EPOLLET
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
@@ -41,12 +44,30 @@ class EPollMonitor(NetworkMonitor):
     def _register(self, fd):
         self._epoll_monitor.register(fd, EPOLLIN)
 
+    # Only clients are registered edge triggered, the listen socket is always
+    # level triggered.
+    def _client_events(self):
+        return EPOLLIN | EPOLLET if self.edge_triggered else EPOLLIN
+
+    def _register_client(self, fd):
+        self._epoll_monitor.register(fd, self._client_events())
+
+    def _register_writer(self, client):
+        self._epoll_monitor.modify(client.socket, self._client_events() | EPOLLOUT)
+
+    def _unregister_writer(self, client):
+        self._epoll_monitor.modify(client.socket, self._client_events())
+
     def on_disconnect(self, client):
+        super(EPollMonitor, self).on_disconnect(client)
         self._epoll_monitor.unregister(client.socket)
 
     def on_connect(self, client):
-        self._register(client.socket)
+        super(EPollMonitor, self).on_connect(client)
+        self._register_client(client.socket)
 
     def watch(self):
-        ready_fds = [fd for (fd, _) in self._epoll_monitor.poll(self._timeout)]
-        super(EPollMonitor, self)._watch(ready_fds)
+        events = self._epoll_monitor.poll(self._timeout)
+        ready_fds = [fd for (fd, e) in events if e & ~EPOLLOUT]
+        writable_fds = [fd for (fd, e) in events if e & EPOLLOUT]
+        super(EPollMonitor, self)._watch(ready_fds, writable_fds)
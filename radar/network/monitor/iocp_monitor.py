@@ -45,10 +45,12 @@ class IOCPMonitor(NetworkMonitor):
         self._fds.append(fd)
 
     def on_disconnect(self, client):
+        super(IOCPMonitor, self).on_disconnect(client)
         CancelIo(client.socket.fileno())
         self._fds.remove(client.socket)
 
     def on_connect(self, client):
+        super(IOCPMonitor, self).on_connect(client)
         self._register(client.socket)
 
     def watch(self):
@@ -26,8 +26,8 @@ from . import NetworkMonitor, NetworkMonitorError
 class KQueueMonitor(NetworkMonitor):
     def __new__(cls, *args, **kwargs):
         try:
-            global kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_EV_ADD, KQ_EV_DELETE
-            from select import kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_EV_ADD, KQ_EV_DELETE
+            global kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_FILTER_WRITE, KQ_EV_ADD, KQ_EV_DELETE
+            from select import kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_FILTER_WRITE, KQ_EV_ADD, KQ_EV_DELETE
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
@@ -41,12 +41,24 @@ class KQueueMonitor(NetworkMonitor):
     def _register(self, fd):
         self._kernel_queue.control([kevent(fd, KQ_FILTER_READ, KQ_EV_ADD | KQ_EV_ENABLE)], 0)
 
+    # Closing the socket removes its write filter, so there's no need to
+    # delete it on disconnection.
+    def _register_writer(self, client):
+        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_ADD | KQ_EV_ENABLE)], 0)
+
+    def _unregister_writer(self, client):
+        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_DELETE)], 0)
+
     def on_disconnect(self, client):
+        super(KQueueMonitor, self).on_disconnect(client)
         self._kernel_queue.control([kevent(client.socket, KQ_FILTER_READ, KQ_EV_DELETE)], 0)
 
     def on_connect(self, client):
+        super(KQueueMonitor, self).on_connect(client)
         self._register(client.socket)
 
     def watch(self):
-        ready_fds = [e.ident for e in self._kernel_queue.control(None, 1, self._timeout)]
-        super(KQueueMonitor, self)._watch(ready_fds)
+        events = self._kernel_queue.control(None, 1, self._timeout)
+        ready_fds = [e.ident for e in events if e.filter == KQ_FILTER_READ]
+        writable_fds = [e.ident for e in events if e.filter == KQ_FILTER_WRITE]
+        super(KQueueMonitor, self)._watch(ready_fds, writable_fds)
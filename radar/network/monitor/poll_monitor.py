@@ -26,8 +26,8 @@ from . import NetworkMonitor, NetworkMonitorError
 class PollMonitor(NetworkMonitor):
     def __new__(cls, *args, **kwargs):
         try:
-            global poll, POLLIN
-            from select import poll, POLLIN
+            global poll, POLLIN, POLLOUT
+            from select import poll, POLLIN, POLLOUT
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
@@ -41,12 +41,22 @@ class PollMonitor(NetworkMonitor):
     def _register(self, fd):
         self._poll_monitor.register(fd, POLLIN)
 
+    def _register_writer(self, client):
+        self._poll_monitor.modify(client.socket, POLLIN | POLLOUT)
+
+    def _unregister_writer(self, client):
+        self._poll_monitor.modify(client.socket, POLLIN)
+
     def on_disconnect(self, client):
+        super(PollMonitor, self).on_disconnect(client)
         self._poll_monitor.unregister(client.socket)
 
     def on_connect(self, client):
+        super(PollMonitor, self).on_connect(client)
         self._register(client.socket)
 
     def watch(self):
-        ready_fds = [fd for (fd, _) in self._poll_monitor.poll(int(self._timeout * 1000))]
-        super(PollMonitor, self)._watch(ready_fds)
+        events = self._poll_monitor.poll(int(self._timeout * 1000))
+        ready_fds = [fd for (fd, e) in events if e & ~POLLOUT]
+        writable_fds = [fd for (fd, e) in events if e & POLLOUT]
+        super(PollMonitor, self)._watch(ready_fds, writable_fds)
@@ -22,6 +22,7 @@ Copyright 2015 Lucas Liendo.
 
 from abc import ABCMeta, abstractmethod
 from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR, SOMAXCONN, error as SocketError
+from errno import EWOULDBLOCK, EAGAIN
 from monitor.select_monitor import SelectMonitor
 from monitor.poll_monitor import PollMonitor
 from monitor.epoll_monitor import EPollMonitor
@@ -29,6 +30,11 @@ from monitor.kqueue_monitor import KQueueMonitor
 from client import ClientReceiveError, ClientSendError, ClientDisconnected, ClientAbortError, Client as BaseClient
 from ..platform_setup import Platform
 
+try:
+    from socket import SO_REUSEPORT
+except ImportError:
+    SO_REUSEPORT = None
+
 
 class ServerListenError(Exception):
     pass
@@ -38,6 +44,10 @@ class ServerAcceptError(Exception):
     pass
 
 
+class ServerAcceptNotReady(Exception):
+    pass
+
+
 class ServerPlatformError(Exception):
     pass
 
@@ -60,19 +70,30 @@ class Server(object):
 
     Client = None
 
-    def __init__(self, address, port, network_monitor=None, network_monitor_timeout=None, blocking_socket=True):
+    def __init__(self, address, port, network_monitor=None, network_monitor_timeout=None, blocking_socket=True,
+                 edge_triggered=False, max_accepts=1, reuse_port=False):
         self.blocking_socket = blocking_socket
+        self.reuse_port = reuse_port
+        # A blocking listen socket would block on the second accept of a batch.
+        self.max_accepts = 1 if blocking_socket else self._validate_max_accepts(max_accepts)
         self.socket = None
         self._clients = []
         self._listen(address, port)
-        self.network_monitor = network_monitor or self._get_network_monitor(network_monitor_timeout)
+        self.network_monitor = network_monitor or self._get_network_monitor(network_monitor_timeout, edge_triggered)
+
+    @staticmethod
+    def _validate_max_accepts(max_accepts):
+        if type(max_accepts) != int or max_accepts < 1:
+            raise ServerError('Error - \'{:}\' is not a valid number of max accepts.'.format(max_accepts))
+
+        return max_accepts
 
-    def _get_network_monitor(self, network_monitor_timeout):
+    def _get_network_monitor(self, network_monitor_timeout, edge_triggered):
         platform = Platform.get_os_type()
 
         for NetworkMonitor in self.AVAILABLE_PLATFORM_MONITORS[platform]:
             try:
-                return NetworkMonitor(self, network_monitor_timeout)
+                return NetworkMonitor(self, network_monitor_timeout, edge_triggered=edge_triggered)
             except KeyError:
                 raise ServerPlatformError('Error - Platform : \'{:}\' is not available.'.format(platform))
             except AttributeError:
@@ -98,10 +119,13 @@ class Server(object):
     def on_reject(self, client):
         pass
 
+    # The client's write lock is held so no other thread writing to it
+    # registers it for writing while it is removed from the network monitor.
     def disconnect(self, client):
-        self.network_monitor.on_disconnect(client)
-        self._clients.remove(client)
-        client.disconnect()
+        with client.write_lock:
+            self.network_monitor.on_disconnect(client)
+            self._clients.remove(client)
+            client.disconnect()
 
     def _on_disconnect(self, client):
         self.on_disconnect(client)
@@ -111,10 +135,11 @@ class Server(object):
         pass
 
     def _on_abort(self, client):
-        self.network_monitor.on_disconnect(client)
-        self.on_abort(client)
-        self._clients.remove(client)
-        client.abort()
+        with client.write_lock:
+            self.network_monitor.on_disconnect(client)
+            self.on_abort(client)
+            self._clients.remove(client)
+            client.abort()
 
     def on_abort(self, client):
         pass
@@ -133,6 +158,9 @@ class Server(object):
         self.on_receive_error(client, error)
         self.disconnect(client)
 
+    def on_send_error(self, client, error):
+        pass
+
     # In case the user of this class decides to perform a send just after reception.
     def _on_send_error(self, client, error):
         self.on_send_error(client, error)
@@ -143,11 +171,22 @@ class Server(object):
         self.socket.close()
         self.socket = None
 
+    # Allows several processes to listen on the same address and port, the
+    # kernel then balances incoming connections among them.
+    def _reuse_port(self):
+        if SO_REUSEPORT is None:
+            raise ServerListenError('Error - SO_REUSEPORT is not supported on this platform.')
+
+        self.socket.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+
     def _listen(self, address, port):
         try:
             self.socket = socket(AF_INET, SOCK_STREAM)
             self.socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
 
+            if self.reuse_port:
+                self._reuse_port()
+
             if not self.blocking_socket:
                 self.socket.setblocking(0)
 
@@ -159,7 +198,10 @@ class Server(object):
     def _accept(self):
         try:
             client_socket, (address, port) = self.socket.accept()
-        except SocketError, (_, e):
+        except SocketError, (error_code, e):
+            if error_code in [EWOULDBLOCK, EAGAIN]:
+                raise ServerAcceptNotReady()
+
             raise ServerAcceptError('Error - Couldn\'t accept new client. Details : {:}.'.format(e))
 
         if not self.blocking_socket:
@@ -168,7 +210,31 @@ class Server(object):
         if (self.Client is None) or (not issubclass(self.Client, BaseClient)):
             raise ServerError('Error - Wrong \'Client\' subclass or \'Client\' subclass not defined.')
 
-        return self.Client(address, port, socket=client_socket, blocking_socket=self.blocking_socket)
+        return self.Client(address, port, socket=client_socket, blocking_socket=self.blocking_socket,
+                           network_monitor=self.network_monitor)
+
+    def _on_accept(self, client):
+        if self.accept_client(client):
+            self._on_connect(client)
+        else:
+            self._on_reject(client)
+
+    # Accepts as many pending clients as possible (up to max_accepts) so a
+    # burst of connections doesn't need a full watch cycle per client.
+    def _accept_clients(self):
+        try:
+            for _ in xrange(self.max_accepts):
+                self._on_accept(self._accept())
+        except ServerAcceptNotReady:
+            pass
+
+    # Sends any data that was queued to clients whose sockets became writable.
+    def _flush_clients(self, clients):
+        for c in clients:
+            try:
+                c.flush()
+            except ClientSendError, error:
+                self._on_send_error(c, error)
 
     def _serve_ready_clients(self, clients):
         for c in clients:
@@ -190,9 +256,10 @@ class Server(object):
         return self.socket is not None
 
     def run(self):
-        while not self.is_stopped():
-            self.network_monitor.watch()
-
-        self.on_shutdown()
+        try:
+            while not self.is_stopped():
+                self.network_monitor.watch()
+        finally:
+            self.on_shutdown()
 
         return self.is_stopped()
@@ -56,6 +56,7 @@ class WindowsClientSetup(ClientConfig, WindowsSetup):
     PLATFORM_CONFIG = deepcopy(ClientConfig.DEFAULT_CONFIG)
     PLATFORM_CONFIG.update({
         'checks': PLATFORM_CONFIG_PATH + '\\Checks',
+        'exec server': False,
     })
     PLATFORM_CONFIG['log']['to'] = BASE_PATH + '\\Log\\radar-client.log'
 
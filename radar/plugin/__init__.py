@@ -20,7 +20,6 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from Queue import Empty as EmptyQueue
 from abc import ABCMeta
 from ctypes import cast, py_object
 from functools import reduce
@@ -101,9 +100,6 @@ class ServerPlugin(ConfigBuilder, Switchable):
 
 
 class PluginManager(Thread):
-
-    STOP_EVENT_TIMEOUT = 0.2
-
     def __init__(self, platform_setup, queue, stop_event=None):
         Thread.__init__(self)
         self._logger = platform_setup.logger
@@ -117,15 +113,23 @@ class PluginManager(Thread):
         return [cast(object_id, py_object).value for object_id in ids]
 
     def _flatten(self, list_of_lists):
-        return reduce(lambda l, m: l + m, list_of_lists)
+        return reduce(lambda l, m: l + m, list_of_lists, [])
+
+    # Messages written from other processes carry copies of the objects
+    # instead of their ids.
+    def _get_objects(self, message, objects_key, ids_key):
+        if objects_key in message:
+            return message[objects_key]
+
+        return self._dereference(message[ids_key])
 
     def _get_plugin_args(self, message):
         return (
             message['address'],
             message['port'],
             message['message_type'],
-            self._flatten([c.as_list() for c in self._dereference(message['check_ids'])]),
-            self._flatten([c.as_list() for c in self._dereference(message['contact_ids'])]),
+            self._flatten([c.as_list() for c in self._get_objects(message, 'checks', 'check_ids')]),
+            self._flatten([c.as_list() for c in self._get_objects(message, 'contacts', 'contact_ids')]),
         )
 
     def is_stopped(self):
@@ -138,13 +142,17 @@ class PluginManager(Thread):
             self._logger.log('Error - Plugin \'{:}\' version \'{:}\' raised an error. Details : {:}.'.format(
                 plugin.PLUGIN_NAME, plugin.PLUGIN_VERSION, e))
 
-    def _run_plugins(self, queue_message):
+    # Besides being called for every queued message, this is called directly
+    # by servers that run plugins on their own thread (without any queue).
+    def run_plugins(self, queue_message):
         plugin_args = self._get_plugin_args(queue_message)
         [self._run_plugin(p, *plugin_args) for p in self._plugins if p.enabled]
 
+    # Blocks until a message arrives, servers write a None to the queue when
+    # they shut down.
     def run(self):
         while not self.is_stopped():
-            try:
-                self._run_plugins(self._queue.get_nowait())
-            except EmptyQueue:
-                self.stop_event.wait(self.STOP_EVENT_TIMEOUT)
+            queue_message = self._queue.get()
+
+            if queue_message is not None:
+                self.run_plugins(queue_message)
@@ -20,8 +20,10 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from io import BytesIO
-from struct import pack, unpack, calcsize
+from functools import reduce
+from json import JSONDecoder, dumps as serialize_json, loads as deserialize_json
+from struct import Struct, pack, unpack_from, calcsize
+from zlib import compress, decompressobj, error as ZlibError
 from ..network.client import ClientDataNotReady, ClientAbortError
 
 
@@ -29,102 +31,522 @@ class MessageNotReady(Exception):
     pass
 
 
+# Decodes a JSON list as its pieces arrive, returning every element as soon
+# as it has been completely received. Only the element being received is kept
+# in memory, not the whole list. What the list expects next (an element, a
+# comma or its end) is kept between pieces, as a piece may end anywhere.
+class JSONListDecoder(object):
+
+    WHITESPACE = ' \t\n\r'
+    NUMBER_CHARACTERS = '0123456789.eE+-'
+    MAX_PENDING_SIZE = 16 * (1024 ** 2)
+
+    def __init__(self):
+        self._decoder = JSONDecoder()
+        self._pending = ''
+        self._started = False
+        self._finished = False
+        self._expecting_comma = False
+        self._expecting_element = False
+
+    def _skip_whitespace(self, index):
+        while index < len(self._pending) and self._pending[index] in self.WHITESPACE:
+            index += 1
+
+        return index
+
+    def _expect(self, index, token):
+        if self._pending[index] != token:
+            raise ValueError('Expecting \'{:}\' at position {:}.'.format(token, index))
+
+        return index + 1
+
+    def _unexpected(self, index):
+        token = self._pending[index]
+        return (token == ']' and self._expecting_element) or (token == ',' and not self._expecting_comma)
+
+    # A decoded element is only accepted if something follows it, otherwise
+    # it could be a number that continues in the next piece (the same goes for
+    # a number followed by anything that may still be part of it).
+    def _may_continue(self, element, end):
+        return end == len(self._pending) or \
+            (isinstance(element, (int, long, float)) and self._pending[end] in self.NUMBER_CHARACTERS)
+
+    def _decode_elements(self, last):
+        elements = []
+        index = self._skip_whitespace(0)
+
+        if not self._started and index < len(self._pending):
+            index = self._skip_whitespace(self._expect(index, '['))
+            self._started = True
+
+        while self._started and not self._finished and index < len(self._pending):
+            if self._unexpected(index):
+                raise ValueError('Unexpected \'{:}\' at position {:}.'.format(self._pending[index], index))
+
+            if self._pending[index] == ']':
+                self._finished = True
+                index += 1
+                break
+
+            if self._expecting_comma:
+                index = self._skip_whitespace(self._expect(index, ','))
+                self._expecting_comma = False
+                self._expecting_element = True
+                continue
+
+            try:
+                element, end = self._decoder.raw_decode(self._pending, index)
+            except ValueError:
+                if last:
+                    raise
+
+                break
+
+            if not last and self._may_continue(element, end):
+                break
+
+            elements.append(element)
+            self._expecting_comma = True
+            self._expecting_element = False
+            index = self._skip_whitespace(end)
+
+        self._pending = self._pending[index:]
+
+        return elements
+
+    def feed(self, data, last=False):
+        self._pending += data
+        elements = self._decode_elements(last)
+
+        if last and not self._finished:
+            raise ValueError('Incomplete JSON list.')
+
+        if len(self._pending) > self.MAX_PENDING_SIZE:
+            raise ValueError('JSON list element exceeds {:} bytes.'.format(self.MAX_PENDING_SIZE))
+
+        return elements
+
+
+class JSONCodec(object):
+    def encode(self, message):
+        return serialize_json(message)
+
+    def decoder(self):
+        return JSONListDecoder()
+
+
+# Compact binary representation of a list. The list starts with its number
+# of elements and every element is encoded as a fixed size record followed
+# by its variable length fields. Check ids and statuses are stored as plain
+# integers and paths, args and details as UTF-8 strings, any other key (or
+# an element that isn't a check dictionary) is stored as JSON.
+class BinaryRecord(object):
+
+    COUNT = Struct('!I')
+    RECORD = Struct('!BIbIIII')
+
+    ID = 0x01
+    STATUS = 0x02
+    PATH = 0x04
+    ARGS = 0x08
+    DETAILS = 0x10
+    EXTRA = 0x20
+    ELEMENT = 0x40
+
+    FIELDS = [
+        (ID, 'id'),
+        (STATUS, 'status'),
+        (PATH, 'path'),
+        (ARGS, 'args'),
+        (DETAILS, 'details'),
+    ]
+
+    MAX_ID = 0xffffffff
+
+    @staticmethod
+    def _encode_string(value):
+        return value.encode('utf-8') if type(value) is unicode else value
+
+    def _pack_element(self, element):
+        extra = serialize_json(element)
+        return self.RECORD.pack(self.ELEMENT | self.EXTRA, 0, 0, 0, 0, 0, len(extra)) + extra
+
+    def _pack_extra(self, element, flags):
+        encoded = [k for f, k in self.FIELDS if flags & f]
+        return serialize_json(dict([(k, v) for k, v in element.iteritems() if k not in encoded]))
+
+    def pack(self, element):
+        if type(element) is not dict:
+            return self._pack_element(element)
+
+        flags = id = status = encoded = 0
+        path = args = details = extra = ''
+        value = element.get('id')
+
+        if type(value) in (int, long) and 0 <= value <= self.MAX_ID:
+            flags, id, encoded = self.ID, value, 1
+
+        value = element.get('status')
+
+        if type(value) in (int, long) and -128 <= value <= 127:
+            flags, status, encoded = flags | self.STATUS, value, encoded + 1
+
+        value = element.get('path')
+
+        if isinstance(value, basestring):
+            flags, path, encoded = flags | self.PATH, self._encode_string(value), encoded + 1
+
+        value = element.get('args')
+
+        if isinstance(value, basestring):
+            flags, args, encoded = flags | self.ARGS, self._encode_string(value), encoded + 1
+
+        value = element.get('details')
+
+        if isinstance(value, basestring):
+            flags, details, encoded = flags | self.DETAILS, self._encode_string(value), encoded + 1
+
+        if len(element) > encoded:
+            flags, extra = flags | self.EXTRA, self._pack_extra(element, flags)
+
+        return self.RECORD.pack(flags, id, status, len(path), len(args), len(details), len(extra)) + \
+            path + args + details + extra
+
+    # Returns the element starting at offset and the size of its record or
+    # None if the record hasn't been fully received.
+    def unpack(self, data, offset):
+        available = len(data) - offset
+
+        if available < self.RECORD.size:
+            return None
+
+        flags, id, status, path, args, details, extra = self.RECORD.unpack_from(data, offset)
+        start = offset + self.RECORD.size
+        size = self.RECORD.size + path + args + details + extra
+
+        if available < size:
+            return None
+
+        path, args, details = path + start, args + path + start, details + args + path + start
+
+        if flags & self.ELEMENT:
+            return deserialize_json(data[details:details + extra]), size
+
+        element = deserialize_json(data[details:details + extra]) if flags & self.EXTRA else {}
+
+        if type(element) is not dict:
+            raise ValueError('Expecting a dictionary in binary record.')
+
+        if flags & self.ID:
+            element['id'] = id
+
+        if flags & self.STATUS:
+            element['status'] = status
+
+        if flags & self.PATH:
+            element['path'] = data[start:path].decode('utf-8')
+
+        if flags & self.ARGS:
+            element['args'] = data[path:args].decode('utf-8')
+
+        if flags & self.DETAILS:
+            element['details'] = data[args:details].decode('utf-8')
+
+        return element, size
+
+
+# Counterpart of the JSONListDecoder for binary encoded lists.
+class BinaryListDecoder(object):
+
+    MAX_PENDING_SIZE = JSONListDecoder.MAX_PENDING_SIZE
+
+    def __init__(self, record):
+        self._record = record
+        self._pending = ''
+        self._remaining = None
+
+    def _decode_elements(self):
+        elements = []
+        offset = 0
+
+        if self._remaining is None and len(self._pending) >= self._record.COUNT.size:
+            self._remaining, = self._record.COUNT.unpack_from(self._pending)
+            offset = self._record.COUNT.size
+
+        while self._remaining:
+            unpacked = self._record.unpack(self._pending, offset)
+
+            if unpacked is None:
+                break
+
+            elements.append(unpacked[0])
+            offset += unpacked[1]
+            self._remaining -= 1
+
+        self._pending = self._pending[offset:]
+
+        return elements
+
+    def feed(self, data, last=False):
+        self._pending += data
+        elements = self._decode_elements()
+
+        if last and (self._remaining != 0 or self._pending):
+            raise ValueError('Incomplete binary list.')
+
+        if len(self._pending) > self.MAX_PENDING_SIZE:
+            raise ValueError('Binary list element exceeds {:} bytes.'.format(self.MAX_PENDING_SIZE))
+
+        return elements
+
+
+class BinaryCodec(object):
+    def __init__(self):
+        self._record = BinaryRecord()
+
+    def encode(self, message):
+        return self._record.COUNT.pack(len(message)) + ''.join([self._record.pack(e) for e in message])
+
+    def decoder(self):
+        return BinaryListDecoder(self._record)
+
+
+# State of a message whose frames are still being received.
+class IncomingMessage(object):
+    def __init__(self, message_type, message_options):
+        self.message_type = message_type
+        self._decoder = Message.CODECS[message_options & Message.CODEC_OPTIONS].decoder()
+        self._decompressor = decompressobj() if message_options & Message.OPTIONS['COMPRESS'] else None
+
+    def feed(self, payload, last):
+        if self._decompressor:
+            payload = self._decompressor.decompress(payload) + (self._decompressor.flush() if last else '')
+
+        return self._decoder.feed(payload, last=last)
+
+
 class Message(object):
 
     HEADER_FORMAT = '!BBH'
     HEADER_SIZE = calcsize(HEADER_FORMAT)
-    MAX_PAYLOAD_SIZE = 65536
+    MAX_PAYLOAD_SIZE = 65535
     PAYLOAD_FORMAT = '{:}s'
+    BUFFER_SIZE = 4096
+    COMPRESSION_THRESHOLD = 1024
 
     TYPE = {
         'TEST': 0,
         'TEST REPLY': 1,
         'CHECK': 2,
         'CHECK REPLY': 3,
+        'SCHEDULE': 4,
     }
 
+    # A message whose payload doesn't fit in a single frame is split across
+    # several ones, every frame but the last is marked as CONTINUED. Peers not
+    # aware of this option reject such frames, but they could never receive
+    # those messages anyway. The BINARY option selects the codec the payload
+    # was encoded with. ACCEPT COMPRESS tells the peer that the sender is able
+    # to decompress messages.
     OPTIONS = {
         'NONE': 0x00,
         'COMPRESS': 0x01,
+        'CONTINUED': 0x02,
+        'BINARY': 0x04,
+        'ACCEPT COMPRESS': 0x08,
     }
 
-    # TODO: Use just one buffer ?
-    def __init__(self):
-        self.header = BytesIO()
-        self.payload = BytesIO()
+    OPTIONS_MASK = reduce(lambda l, m: l | m, OPTIONS.values())
+
+    CODECS = {
+        OPTIONS['NONE']: JSONCodec(),
+        OPTIONS['BINARY']: BinaryCodec(),
+    }
+
+    CODEC_OPTIONS = OPTIONS['BINARY']
+
+    # A single receive buffer is kept between calls. Data between _start and
+    # _end has been received but not consumed yet, it may hold several
+    # frames (or a fragment of one) read at once from the socket.
+    #
+    # Compression is negotiated : a peer that wants to compress sets the
+    # ACCEPT COMPRESS option on every message it sends, but doesn't compress
+    # anything until the other end has shown it supports compression (by
+    # setting that option or sending a compressed message). From then on both
+    # ends compress any payload above COMPRESSION_THRESHOLD. Peers unaware of
+    # compression reject the option and reset the connection instead of
+    # receiving payloads they can't decode. The binary encoding works the
+    # same way : once a peer sends a binary message it gets binary replies.
+    def __init__(self, compress=False, binary=False):
+        self._buffer = bytearray(self.BUFFER_SIZE)
+        self._start = 0
+        self._end = 0
+        self._incoming = None
+        self.compress = compress
+        self._peer_decompresses = False
+        self.binary = binary
 
     @staticmethod
     def get_type(message_type):
         return Message.TYPE.keys()[Message.TYPE.values().index(message_type)]
 
-    def _header_received(self):
-        return len(self.header.getvalue()) == self.HEADER_SIZE
-
-    def _payload_received(self, payload_size):
-        return len(self.payload.getvalue()) == payload_size
-
-    def _unpack_header(self, header):
-        return unpack(self.HEADER_FORMAT, header)
-
     def _pack(self, message_type, message_options, message):
         message_length = len(message)
         pack_format = (self.HEADER_FORMAT + self.PAYLOAD_FORMAT).format(message_length)
         return pack(pack_format, message_type, message_options, message_length, message)
 
-    # TODO: Better way ? _receive_header & _receive_payload are one and the same...
-    # Will it help to use a single buffer ?
-    def _receive_header(self, client):
-        if not self._header_received():
-            try:
-                received_bytes = client.receive(self.HEADER_SIZE - len(self.header.getvalue()))
-                self.header.write(received_bytes)
-            except ClientDataNotReady:
-                raise MessageNotReady()
-
-            if not self._header_received():
-                raise MessageNotReady()
+    def _buffered(self):
+        return self._end - self._start
 
-        return self.header.getvalue()
+    # Once everything was consumed the buffer goes back to its initial size,
+    # a single large message doesn't leave every connection holding a large
+    # buffer.
+    def _release_buffer(self):
+        self._start = 0
+        self._end = 0
 
-    def _receive_payload(self, client, payload_size):
-        if not self._payload_received(payload_size):
-            try:
-                received_bytes = client.receive(payload_size - len(self.payload.getvalue()))
-                self.payload.write(received_bytes)
-            except ClientDataNotReady:
-                raise MessageNotReady()
-
-            if not self._payload_received(payload_size):
-                raise MessageNotReady()
-
-        return self.payload.getvalue()
+        if len(self._buffer) > self.BUFFER_SIZE:
+            del self._buffer[self.BUFFER_SIZE:]
 
     def _reset_buffers(self):
-        self.header = BytesIO()
-        self.payload = BytesIO()
+        self._release_buffer()
+        self._incoming = None
 
     def _invalid_header(self, message_type, message_options, payload_size):
         return (message_type not in self.TYPE.values()) or \
-            (message_options not in self.OPTIONS.values()) or payload_size == 0
+            (message_options & ~self.OPTIONS_MASK) or payload_size == 0
 
-    def receive(self, client):
-        message_type, message_options, payload_size = self._unpack_header(self._receive_header(client))
+    def _abort(self):
+        self._reset_buffers()
+        raise ClientAbortError()
+
+    def _unpack_header(self):
+        message_type, message_options, payload_size = unpack_from(self.HEADER_FORMAT, self._buffer, self._start)
 
         if self._invalid_header(message_type, message_options, payload_size):
-            self._reset_buffers()
-            raise ClientAbortError()
+            self._abort()
 
-        payload = self._receive_payload(client, payload_size)
-        self._reset_buffers()
+        return message_type, message_options, payload_size
+
+    # Returns the size of the frame at the head of the buffer or None if
+    # its header hasn't been fully received.
+    def _frame_size(self):
+        if self._buffered() < self.HEADER_SIZE:
+            return None
+
+        _, _, payload_size = self._unpack_header()
+
+        return self.HEADER_SIZE + payload_size
+
+    def pending(self):
+        frame_size = self._frame_size()
+        return (frame_size is not None) and (self._buffered() >= frame_size)
+
+    # Moves any unconsumed data to the beginning of the buffer and makes sure
+    # the frame being received fits in it.
+    def _prepare_buffer(self):
+        if self._start > 0:
+            self._buffer[:self._buffered()] = self._buffer[self._start:self._end]
+            self._end = self._buffered()
+            self._start = 0
+
+        frame_size = self._frame_size() or self.HEADER_SIZE
+
+        if frame_size > len(self._buffer):
+            self._buffer.extend(bytearray(frame_size - len(self._buffer)))
+
+    def _fill_buffer(self, client):
+        self._prepare_buffer()
+
+        try:
+            self._end += client.receive_into(memoryview(self._buffer)[self._end:])
+        except ClientDataNotReady:
+            raise MessageNotReady()
+
+    def _get_incoming(self, message_type, message_options):
+        if self._incoming is None:
+            self._incoming = IncomingMessage(message_type, message_options)
+        elif self._incoming.message_type != message_type:
+            self._abort()
+
+        if message_options & (self.OPTIONS['COMPRESS'] | self.OPTIONS['ACCEPT COMPRESS']):
+            self.compress = True
+            self._peer_decompresses = True
+
+        if message_options & self.OPTIONS['BINARY']:
+            self.binary = True
 
-        return message_type, payload
+        return self._incoming
 
+    # Consumes the frame at the head of the buffer and returns the elements
+    # of the message that could be decoded so far.
+    def _consume(self):
+        message_type, message_options, payload_size = self._unpack_header()
+        payload_start = self._start + self.HEADER_SIZE
+        payload = memoryview(self._buffer)[payload_start:payload_start + payload_size].tobytes()
+        last = not (message_options & self.OPTIONS['CONTINUED'])
+        incoming = self._get_incoming(message_type, message_options)
+        self._start = payload_start + payload_size
+
+        try:
+            elements = incoming.feed(payload, last)
+        except (ValueError, ZlibError):
+            self._abort()
+
+        if self._start == self._end:
+            self._release_buffer()
+
+        if last:
+            self._incoming = None
+
+        return message_type, elements, last
+
+    # Returns the message type, the decoded elements of the message and
+    # whether they're its last part. Long messages are returned in parts, as
+    # soon as some of their elements have been received. Only reads from the
+    # client when no complete frame is already waiting in the buffer, and then
+    # it keeps reading until a frame is complete or the client has no more
+    # data (so an edge triggered monitor never leaves unread data behind).
+    def receive(self, client):
+        while True:
+            while not self.pending():
+                self._fill_buffer(client)
+
+            message_type, elements, last = self._consume()
+
+            if elements or last:
+                return message_type, elements, last
+
+    def _should_compress(self, payload):
+        return self.compress and self._peer_decompresses and (len(payload) >= self.COMPRESSION_THRESHOLD)
+
+    def _split(self, payload):
+        return [payload[n:n + self.MAX_PAYLOAD_SIZE] for n in xrange(0, len(payload), self.MAX_PAYLOAD_SIZE)]
+
+    def _pack_frames(self, message_type, message_options, payload):
+        frames = self._split(payload)
+        continued = message_options | self.OPTIONS['CONTINUED']
+        packed_frames = [self._pack(message_type, continued, f) for f in frames[:-1]]
+        packed_frames.append(self._pack(message_type, message_options, frames[-1]))
+
+        return ''.join(packed_frames)
+
+    def _encode(self, message):
+        codec_option = self.OPTIONS['BINARY'] if self.binary else self.OPTIONS['NONE']
+        return codec_option, self.CODECS[codec_option].encode(message)
+
+    # The message is handed to the client as a whole, it gets sent as soon as
+    # the client's socket accepts it without ever blocking the caller.
     def send(self, client, message_type, message, message_options=OPTIONS['NONE']):
-        packed_message = self._pack(message_type, message_options, message)
-        message_length = len(packed_message)
-        sent_bytes = 0
+        codec_option, payload = self._encode(message)
+        message_options |= codec_option
+
+        if self.compress:
+            message_options |= self.OPTIONS['ACCEPT COMPRESS']
 
-        while sent_bytes < message_length:
-            sent_bytes += client.send(packed_message[sent_bytes:message_length])
+        if self._should_compress(payload):
+            payload = compress(payload)
+            message_options |= self.OPTIONS['COMPRESS']
 
-        return sent_bytes
+        return client.write(self._pack_frames(message_type, message_options, payload))
@@ -22,9 +22,11 @@ Copyright 2015 Lucas Liendo.
 
 from Queue import Full as FullQueue
 from datetime import datetime, timedelta
-from json import loads as deserialize_json
+from time import time
 from threading import Thread, Event
+from multiprocessing import Process, Event as ProcessEvent
 from ..client import RadarClientLite
+from ..client_manager import ClientManager
 from ..network.server import Server
 from ..protocol import MessageNotReady
 
@@ -38,7 +40,7 @@ class RadarServer(Server, Thread):
     Client = RadarClientLite
     NETWORK_MONITOR_TIMEOUT = 0.2
 
-    def __init__(self, client_manager, platform_setup, queue, stop_event=None):
+    def __init__(self, client_manager, platform_setup, queue, stop_event=None, reuse_port=False):
         Thread.__init__(self)
         Server.__init__(
             self,
@@ -46,6 +48,9 @@ class RadarServer(Server, Thread):
             platform_setup.config['listen']['port'],
             network_monitor_timeout=self.NETWORK_MONITOR_TIMEOUT,
             blocking_socket=False,
+            edge_triggered=platform_setup.config['edge triggered'],
+            max_accepts=platform_setup.config['max accepts'],
+            reuse_port=reuse_port,
         )
         self._client_manager = client_manager
         self._logger = platform_setup.logger
@@ -72,8 +77,8 @@ class RadarServer(Server, Thread):
         self._logger.log('Error - Client {:}:{:} sent an unknown message. Resetting connection.'.format(
             client.address, client.port))
 
-    def _write_queue(self, client, message_type, updated_checks):
-        queue_message = {
+    def _build_queue_message(self, client, message_type, updated_checks):
+        return {
             'address': client.address,
             'port': client.port,
             'message_type': message_type,
@@ -81,25 +86,58 @@ class RadarServer(Server, Thread):
             'contact_ids': [id(c) for c in updated_checks['contacts']]
         }
 
+    # Used when plugins can get the objects themselves instead of their ids.
+    def _build_plugin_message(self, client, message_type, updated_checks):
+        return {
+            'address': client.address,
+            'port': client.port,
+            'message_type': message_type,
+            'checks': list(updated_checks['checks']),
+            'contacts': list(updated_checks['contacts']),
+        }
+
+    def _write_queue(self, client, message_type, updated_checks):
         try:
-            self._queue.put_nowait(queue_message)
+            self._queue.put_nowait(self._build_queue_message(client, message_type, updated_checks))
         except FullQueue, e:
             self._logger.log('Error - Couldn\'t write to queue. Details : {:}.'.format(e))
 
+    def _process_message(self, client):
+        message_type, message, _ = client.receive_message()
+        updated_checks = self._client_manager.process_message(client, message_type, message)
+        [self._write_queue(client, message_type, uc) for uc in updated_checks]
+
+    # A single read may bring in more than one message, all of them are
+    # processed before going back to the network monitor. When running edge
+    # triggered we won't be notified again about data that is already waiting,
+    # so the client is drained until nothing is left.
     def on_receive(self, client):
         try:
-            message_type, message = client.receive_message()
-            deserialized_message = deserialize_json(message)
-            updated_checks = self._client_manager.process_message(client, message_type, deserialized_message)
-            [self._write_queue(client, message_type, uc) for uc in updated_checks]
+            self._process_message(client)
+
+            while self.network_monitor.edge_triggered or client.message_pending():
+                self._process_message(client)
         except MessageNotReady:
             pass
 
+    # The PluginManager blocks reading the queue, a None is written to it to
+    # wake it up when the server stops.
+    def on_shutdown(self):
+        super(RadarServer, self).on_shutdown()
+
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+
     def on_receive_error(self, client, error):
         self._client_manager.unregister(client)
         self._logger.log('Error - While receiving data from client {:}:{:}. Details: {:}'.format(
             client.address, client.port, error))
 
+    def on_send_error(self, client, error):
+        self._client_manager.unregister(client)
+        self._logger.log('Error - While sending data to client {:}:{:}. Details: {:}'.format(
+            client.address, client.port, error))
+
     def is_stopped(self):
         return self.stop_event.is_set()
 
@@ -109,7 +147,7 @@ class RadarServerPoller(Thread):
         Thread.__init__(self)
         self._client_manager = client_manager
         self._logger = platform_setup.logger
-        self._polling_time = self._validate(platform_setup.config['polling time'])
+        self.polling_time = self._validate(platform_setup.config['polling time'])
         self.stop_event = stop_event or Event()
 
     def _validate(self, polling_time):
@@ -122,19 +160,105 @@ class RadarServerPoller(Thread):
         return float(polling_time)
 
     def _log_next_poll(self):
-        time = (datetime.now() + timedelta(0, self._polling_time)).strftime('%H:%M:%S')
+        time = (datetime.now() + timedelta(0, self.polling_time)).strftime('%H:%M:%S')
         self._logger.log('Next scheduled poll at : {:}.'.format(time))
 
+    def poll(self):
+        self._client_manager.poll()
+        self._log_next_poll()
+
     def run(self):
         while not self.is_stopped():
-            self._client_manager.poll()
-            self._log_next_poll()
-            self.stop_event.wait(self._polling_time)
+            self.poll()
+            self.stop_event.wait(self.polling_time)
 
     def is_stopped(self):
         return self.stop_event.is_set()
 
 
+# Single threaded alternative to running RadarServer, RadarServerPoller and
+# PluginManager on separate threads. Accepts, replies, polls and plugins are
+# all driven from the network monitor loop, so no queue is needed between
+# them and no thread contends with the others.
+class RadarEventLoopServer(RadarServer):
+    def __init__(self, client_manager, platform_setup, poller, plugin_manager, stop_event=None):
+        RadarServer.__init__(self, client_manager, platform_setup, None, stop_event=stop_event)
+        self._poller = poller
+        self._plugin_manager = plugin_manager
+        self._next_poll = 0
+
+    def _write_queue(self, client, message_type, updated_checks):
+        self._plugin_manager.run_plugins(self._build_plugin_message(client, message_type, updated_checks))
+
+    def _poll_clients(self):
+        if time() >= self._next_poll:
+            self._poller.poll()
+            self._next_poll = time() + self._poller.polling_time
+
+    def run(self):
+        try:
+            while not self.is_stopped():
+                self._poll_clients()
+                self.network_monitor.watch()
+        finally:
+            self.on_shutdown()
+
+        return self.is_stopped()
+
+
+# Plugins run on a different process than the one holding the checks and
+# contacts, so instead of their ids (which can't be dereferenced there) copies
+# of them are written to the queue.
+class RadarServerShard(RadarServer):
+    def __init__(self, client_manager, platform_setup, queue, stop_event=None):
+        RadarServer.__init__(self, client_manager, platform_setup, queue, stop_event=stop_event, reuse_port=True)
+
+    def _build_queue_message(self, client, message_type, updated_checks):
+        return self._build_plugin_message(client, message_type, updated_checks)
+
+
+# Every worker is a process that listens on the same address and port as the
+# remaining ones and has its own ClientManager and poller. All of them share a
+# single queue that is read by the PluginManager on the main process.
+class RadarServerWorker(Process):
+
+    THREAD_POLLING_TIME = 0.2
+
+    def __init__(self, platform_setup, queue, stop_event=None):
+        Process.__init__(self)
+        self._platform_setup = platform_setup
+        self._logger = platform_setup.logger
+        self._queue = queue
+        self._listening = ProcessEvent()
+        self.stop_event = stop_event or ProcessEvent()
+
+    def is_listening(self):
+        return self._listening.is_set()
+
+    def _build_threads(self):
+        client_manager = ClientManager(self._platform_setup)
+
+        return [
+            RadarServerShard(client_manager, self._platform_setup, self._queue, stop_event=self.stop_event),
+            RadarServerPoller(client_manager, self._platform_setup, stop_event=self.stop_event),
+        ]
+
+    def _join_threads(self, threads):
+        while any([t.is_alive() for t in threads]):
+            [t.join(self.THREAD_POLLING_TIME) for t in threads if t.is_alive()]
+
+    def run(self):
+        try:
+            threads = self._build_threads()
+        except Exception, e:
+            self._logger.log('Error - Worker {:} couldn\'t start. Details : {:}.'.format(self.pid, e))
+            return
+
+        self._listening.set()
+        [t.start() for t in threads]
+        self._join_threads(threads)
+
+
 # TODO: Implement me !
 class RadarServerConsole(Thread):
     def __init__(self, client_manager, platform_setup, stop_event=None):
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+# Measures how much memory each of the objects the server holds by the
+# thousands takes. Every model is measured on an interpreter of its own as
+# the maximum resident size of a process never shrinks. Unix only, run it as :
+#
+#   python radar-memory-benchmark.py [model]
+
+from gc import disable as disable_gc
+from platform import system as platform_name
+from resource import getrusage, RUSAGE_SELF
+from subprocess import check_output
+from sys import argv, executable as python_executable
+from radar.check import Check, ClientCheck
+from radar.contact import Contact
+from radar.misc import Address, AddressRange
+
+
+INSTANCES = 200000
+
+SHARED_CHECK = Check(name='uptime', path='uptime', args='-a')
+
+MODELS = {
+    'Check': lambda: Check(name='uptime', path='uptime', args='-a'),
+    'ClientCheck': lambda: ClientCheck(SHARED_CHECK),
+    'Contact': lambda: Contact(name='contact', email='contact@example.com'),
+    'Address': lambda: Address('10.0.0.1'),
+    'AddressRange': lambda: AddressRange('10.0.0.1 - 10.0.0.9'),
+}
+
+
+# Linux reports kilobytes, OS X reports bytes.
+def get_max_rss():
+    rss = getrusage(RUSAGE_SELF).ru_maxrss
+    return rss if platform_name() == 'Darwin' else rss * 1024
+
+
+# Bytes per instance (including its reference from the list holding them).
+def measure(model):
+    disable_gc()
+    build = MODELS[model]
+    before = get_max_rss()
+    instances = [build() for _ in xrange(INSTANCES)]
+
+    return (get_max_rss() - before) / len(instances)
+
+
+def main():
+    if len(argv) == 2:
+        print measure(argv[1])
+        return
+
+    for model in sorted(MODELS):
+        print '{:<14} {:>6} bytes/instance'.format(model, check_output([python_executable, __file__, model]).strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -51,3 +51,9 @@ class TestAddress(TestCase):
     @raises(AddressError)
     def test_address_raises_address_error_exception(self):
         Address('*invalid hostname*')
+
+    def test_address_to_range(self):
+        self.assertEqual(Address('0.0.1.1').to_range(), (257, 257))
+
+    def test_address_has_no_instance_dict(self):
+        self.assertFalse(hasattr(Address('0.0.0.1'), '__dict__'))
@@ -66,3 +66,9 @@ class TestAddressRange(TestCase):
     @raises(AddressError)
     def test_address_range_raises_address_error_due_to_inverted_addresses(self):
         AddressRange('192.168.0.100 - 192.168.0.1')
+
+    def test_address_range_to_range(self):
+        self.assertEqual(AddressRange('0.0.0.1 - 0.0.1.0').to_range(), (1, 256))
+
+    def test_address_range_has_no_instance_dict(self):
+        self.assertFalse(hasattr(AddressRange('0.0.0.1 - 0.0.1.0'), '__dict__'))
@@ -20,11 +20,17 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from unittest import TestCase
-from mock import Mock, MagicMock
+from unittest import TestCase, skipIf
+from mock import Mock, MagicMock, patch
 from nose.tools import raises
+from copy import deepcopy
 from json import dumps as serialize_json
-from radar.check import Check, CheckError
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from os import chmod, close, remove, utime
+from tempfile import mkstemp
+from time import time
+from radar.check import Check, UnixCheck, CheckError, CheckGroup, ClientCheck, ClientCheckGroup
+from radar.platform_setup import Platform
 
 
 class TestCheck(TestCase):
@@ -140,7 +146,10 @@ class TestCheck(TestCase):
 
     def test_to_dict(self):
         d = self.dummy_check.to_dict()
-        expected_keys = ['id', 'name', 'path', 'args', 'current_status', 'previous_status', 'details', 'data', 'enabled']
+        expected_keys = [
+            'id', 'name', 'path', 'args', 'timeout', 'ttl', 'interval', 'type', 'current_status', 'previous_status',
+            'details', 'data', 'enabled',
+        ]
         self._assert_dictionary_contains_keys(d, expected_keys)
 
     def test_to_check_dict(self):
@@ -152,6 +161,48 @@ class TestCheck(TestCase):
         d = Check(name='dummy', path='dummy.py').to_check_dict().pop()
         self.assertTrue('args' not in d)
 
+    def test_to_check_dict_contains_timeout(self):
+        d = Check(name='dummy', path='dummy.py', timeout=10).to_check_dict().pop()
+        self.assertEqual(d['timeout'], 10)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_timeout(self):
+        Check(name='dummy', path='dummy.py', timeout=-1)
+
+    def test_to_check_dict_contains_ttl(self):
+        d = Check(name='dummy', path='dummy.py', ttl=0).to_check_dict().pop()
+        self.assertEqual(d['ttl'], 0)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_ttl(self):
+        Check(name='dummy', path='dummy.py', ttl=-1)
+
+    def test_check_ttl_overrides_default_ttl(self):
+        platform_setup_mock = Mock()
+        platform_setup_mock.config = {'cache ttl': 10}
+        self.assertEqual(Check(name='dummy', path='dummy.py', platform_setup=platform_setup_mock).get_ttl(), 10)
+        self.assertEqual(Check(name='dummy', path='dummy.py', ttl=0, platform_setup=platform_setup_mock).get_ttl(), 0)
+
+    def test_to_check_dict_contains_interval(self):
+        d = Check(name='dummy', path='dummy.py', interval=30).to_check_dict().pop()
+        self.assertEqual(d['interval'], 30)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_interval(self):
+        Check(name='dummy', path='dummy.py', interval=0)
+
+    def test_to_check_dict_does_not_contain_default_type(self):
+        d = Check(name='dummy', path='dummy.py').to_check_dict().pop()
+        self.assertTrue('type' not in d)
+
+    def test_to_check_dict_contains_type(self):
+        d = Check(name='dummy', path='dummy.py', type='python').to_check_dict().pop()
+        self.assertEqual(d['type'], 'python')
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_type(self):
+        Check(name='dummy', path='dummy.py', type='perl')
+
     def test_to_check_reply_dict(self):
         d = Check(name='dummy', path='dummy.py').to_check_reply_dict()
         expected_keys = ['id', 'status']
@@ -169,6 +220,15 @@ class TestCheck(TestCase):
         self.assertEqual(type(self.dummy_check.as_list()), list)
         self.assertEqual(len(self.dummy_check.as_list()), 1)
 
+    def test_check_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.dummy_check, '__dict__'))
+        self.assertFalse(hasattr(UnixCheck(name='dummy', path='dummy.py'), '__dict__'))
+
+    def test_check_deepcopy(self):
+        check = deepcopy(Check(name='dummy', path='dummy.py', args='-a', ttl=10))
+        self.assertEqual(check.to_dict()['ttl'], 10)
+        self.assertEqual(check.args, '-a')
+
     def test_check_set(self):
         duplicated_dummy_check = Check(name='dummy', path='dummy.py')
         another_check = Check(name='Free RAM', path='free-ram.py')
@@ -191,14 +251,181 @@ class TestCheck(TestCase):
 
     def test_run_fails(self):
         dummy_check = Check(name='dummy', path='dummy.py', platform_setup=Mock())
-        dummy_check._call_popen = MagicMock(return_value='{}')
-        dummy_check.run()
+
+        with patch.object(Check, '_call_popen', MagicMock(return_value='{}')):
+            dummy_check.run()
+
         self.assertEqual(dummy_check.current_status, Check.STATUS['ERROR'])
         self.assertEqual(dummy_check.previous_status, Check.STATUS['UNKNOWN'])
 
     def test_run(self):
         dummy_check = Check(name='dummy', path='dummy.py', platform_setup=Mock())
-        dummy_check._call_popen = MagicMock(return_value='{"status": "OK"}')
-        dummy_check.run()
+
+        with patch.object(Check, '_call_popen', MagicMock(return_value='{"status": "OK"}')):
+            dummy_check.run()
+
         self.assertEqual(dummy_check.current_status, Check.STATUS['OK'])
         self.assertEqual(dummy_check.previous_status, Check.STATUS['UNKNOWN'])
+
+    def _build_python_check(self, output):
+        platform_setup_mock = Mock()
+        platform_setup_mock.PLATFORM_CONFIG = {'checks': '/tmp'}
+        platform_setup_mock.config = {'enforce ownership': False, 'check timeout': 10}
+        python_runner_mock = Mock()
+        python_runner_mock.run = MagicMock(return_value=output)
+
+        patcher = patch.object(Check, '_get_file_signature', Mock(return_value=(0, 0, 0, 0, 0)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return Check(name='dummy', path='dummy.py', args='-a 1', type='python', platform_setup=platform_setup_mock,
+                     python_runner=python_runner_mock)
+
+    def test_run_python_check(self):
+        dummy_check = self._build_python_check({'Status': 'warning', 'details': 'dummy'})
+        dummy_check.run()
+        dummy_check._python_runner.run.assert_called_once_with('/tmp/dummy.py', ['-a', '1'], 10)
+        self.assertEqual(dummy_check.current_status, Check.STATUS['WARNING'])
+        self.assertEqual(dummy_check.details, 'dummy')
+
+    def test_run_python_check_returning_json(self):
+        dummy_check = self._build_python_check('{"status": "OK"}')
+        dummy_check.run()
+        self.assertEqual(dummy_check.current_status, Check.STATUS['OK'])
+
+    def test_run_python_check_fails(self):
+        dummy_check = self._build_python_check(['OK'])
+        dummy_check.run()
+        self.assertEqual(dummy_check.current_status, Check.STATUS['ERROR'])
+
+
+class TestClientCheck(TestCase):
+    def setUp(self):
+        self.check = Check(name='Uptime', path='uptime', args='-a', timeout=5)
+        self.client_check = ClientCheck(self.check)
+
+    def test_client_check_reads_definition_from_check(self):
+        self.assertEqual(self.client_check.id, self.check.id)
+        self.assertEqual(self.client_check.to_check_dict(), self.check.to_check_dict())
+        self.assertEqual(self.client_check, self.check)
+
+    def test_client_check_keeps_its_own_status(self):
+        self.client_check.update_status({'id': self.check.id, 'status': Check.STATUS['OK'], 'details': 'up'})
+        self.assertEqual(self.client_check.to_dict()['current_status'], Check.STATUS['OK'])
+        self.assertEqual(self.client_check.details, 'up')
+        self.assertEqual(self.check.current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(self.check.details, '')
+
+    def test_client_check_does_not_update_if_check_disabled(self):
+        self.check.disable()
+        self.assertFalse(self.client_check.update_status({'id': self.check.id, 'status': Check.STATUS['OK']}))
+
+    def test_client_check_can_be_pickled(self):
+        self.client_check.update_status({'id': self.check.id, 'status': Check.STATUS['OK']})
+        client_check = loads(dumps(self.client_check, HIGHEST_PROTOCOL))
+        self.assertEqual(client_check.current_status, Check.STATUS['OK'])
+        self.assertEqual(client_check.name, self.check.name)
+
+    def test_client_check_is_a_standalone_record(self):
+        self.assertFalse(isinstance(self.client_check, Check))
+        self.assertFalse(hasattr(self.client_check, '__dict__'))
+        self.assertEqual(hash(self.client_check), hash(self.check))
+        self.assertEqual(self.client_check.as_list(), [self.client_check])
+        self.assertEqual(self.client_check.timeout, 5)
+
+    def test_client_check_to_dict_keeps_check_definition(self):
+        self.client_check.update_status({'id': self.check.id, 'status': Check.STATUS['OK'], 'data': {'uptime': 1}})
+        expected = self.check.to_dict()
+        expected.update({'current_status': Check.STATUS['OK'], 'data': {'uptime': 1}})
+        self.assertEqual(self.client_check.to_dict(), expected)
+        self.assertEqual(self.client_check.to_check_reply_dict(),
+                         {'id': self.check.id, 'status': Check.STATUS['OK'], 'data': {'uptime': 1}})
+
+    def test_client_check_group_holds_client_checks(self):
+        check_group = CheckGroup(name='group', checks=[self.check])
+        client_check_group = ClientCheckGroup(check_group, [self.client_check])
+        self.assertTrue(client_check_group.update_status({'id': self.check.id, 'status': Check.STATUS['OK']}))
+        self.assertEqual(client_check_group.as_list(), [self.client_check])
+        self.assertEqual(client_check_group.name, 'group')
+        self.assertEqual(client_check_group.to_dict()['checks'][0]['current_status'], Check.STATUS['OK'])
+
+    def test_client_check_group_reads_definition_from_check_group(self):
+        check_group = CheckGroup(name='group', checks=[self.check])
+        client_check_group = ClientCheckGroup(check_group, [self.client_check])
+        self.assertFalse(isinstance(client_check_group, CheckGroup))
+        self.assertEqual(client_check_group.id, check_group.id)
+        self.assertEqual(client_check_group.to_check_dict(), check_group.to_check_dict())
+        self.assertEqual(client_check_group, check_group)
+        self.assertEqual(hash(client_check_group), hash(check_group))
+
+
+class TestCheckPreparation(TestCase):
+    def setUp(self):
+        fd, self.path = mkstemp()
+        close(fd)
+        self.platform_setup = Mock()
+        self.platform_setup.PLATFORM_CONFIG = {'checks': '/tmp'}
+        self.platform_setup.config = {'enforce ownership': True}
+        patcher = patch.object(Check, '_owned_by_stated_user', Mock(return_value=True), create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        remove(self.path)
+
+    def _build_check(self):
+        return Check(name='dummy', path=self.path, args='-a 1', platform_setup=self.platform_setup)
+
+    def test_check_is_prepared_once(self):
+        check = self._build_check()
+        self.assertEqual(check._prepare(), [self.path, '-a', '1'])
+        check._owned_by_stated_user.reset_mock()
+        check = self._build_check()
+        self.assertEqual(check._prepare(), [self.path, '-a', '1'])
+        self.assertFalse(check._owned_by_stated_user.called)
+
+    def test_check_is_prepared_again_if_modified(self):
+        self._build_check()._prepare()
+        utime(self.path, (0, 0))
+        check = self._build_check()
+        check._owned_by_stated_user.reset_mock()
+        check._prepare()
+        check._owned_by_stated_user.assert_called_once_with(self.path)
+
+    @raises(CheckError)
+    def test_prepare_raises_check_error_if_not_owned(self):
+        check = self._build_check()
+        check._owned_by_stated_user.return_value = False
+        self.platform_setup.config['run as'] = {'user': 'radar', 'group': 'radar'}
+        check._prepare()
+
+
+@skipIf(Platform.get_platform_type() != 'UNIX', 'Unix only test.')
+class TestUnixCheckTimeout(TestCase):
+    def setUp(self):
+        fd, self.path = mkstemp()
+        close(fd)
+
+        with open(self.path, 'w') as f:
+            f.write('#!/bin/sh\nsleep 5\necho \'{"status": "OK"}\'\n')
+
+        chmod(self.path, 0700)
+        self.platform_setup = Mock()
+        self.platform_setup.PLATFORM_CONFIG = {'checks': '/tmp'}
+        self.platform_setup.config = {'enforce ownership': False, 'check timeout': 0.2}
+
+    def tearDown(self):
+        remove(self.path)
+
+    def test_check_is_killed_when_it_times_out(self):
+        start = time()
+        check = UnixCheck(name='sleep', path=self.path, platform_setup=self.platform_setup).run()
+        self.assertTrue(time() - start < 2)
+        self.assertEqual(check.current_status, Check.STATUS['TIMEOUT'])
+        self.assertTrue(check.details)
+
+    def test_check_timeout_overrides_default_timeout(self):
+        self.platform_setup.config['check timeout'] = 10
+        check = UnixCheck(name='sleep', path=self.path, timeout=0.2, platform_setup=self.platform_setup).run()
+        self.assertEqual(check.current_status, Check.STATUS['TIMEOUT'])
+
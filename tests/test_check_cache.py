@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock, patch
+from threading import Thread
+from time import sleep
+from radar.check import Check
+from radar.check_manager.check_cache import CheckCache
+
+
+class TestCheckCache(TestCase):
+    def setUp(self):
+        self.platform_setup = Mock()
+        self.platform_setup.config = {'cache ttl': 10}
+        self.runs = 0
+        self.duration = 0
+        self.cache = CheckCache()
+        patcher = patch.object(Check, '_call_popen', Mock(side_effect=self._run))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _build_check(self, id, duration=0, **kwargs):
+        self.duration = duration
+        return Check(id=id, name='dummy', path='dummy.py', platform_setup=self.platform_setup, **kwargs)
+
+    def _run(self):
+        self.runs += 1
+        sleep(self.duration)
+        return '{{"status": "OK", "details": "{:}"}}'.format(self.runs)
+
+    def test_result_is_reused_within_ttl(self):
+        self.cache.run(self._build_check(1))
+        check = self.cache.run(self._build_check(2))
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(check.to_check_reply_dict(), {'id': 2, 'status': Check.STATUS['OK'], 'details': '1'})
+
+    def test_result_is_not_reused_after_ttl(self):
+        self.cache.run(self._build_check(1, ttl=0.1))
+        sleep(0.2)
+        self.cache.run(self._build_check(2, ttl=0.1))
+        self.assertEqual(self.runs, 2)
+
+    def test_result_is_not_reused_if_ttl_is_zero(self):
+        self.platform_setup.config['cache ttl'] = 0
+        [self.cache.run(self._build_check(i)) for i in range(1, 4)]
+        self.assertEqual(self.runs, 3)
+
+    def test_different_checks_are_not_cached_together(self):
+        self.cache.run(self._build_check(1))
+        self.cache.run(self._build_check(2, args='-v'))
+        self.assertEqual(self.runs, 2)
+
+    def test_concurrent_requests_share_a_single_run(self):
+        self.platform_setup.config['cache ttl'] = 0
+        checks = [self._build_check(i, duration=0.2) for i in range(1, 5)]
+        threads = [Thread(target=self.cache.run, args=(c,)) for c in checks]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertEqual(self.runs, 1)
+        self.assertTrue(all([c.current_status == Check.STATUS['OK'] for c in checks]))
+        self.assertEqual(sorted([c.id for c in checks]), range(1, 5))
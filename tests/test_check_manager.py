@@ -20,11 +20,17 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from unittest import TestCase
-from mock import Mock, ANY
+from unittest import TestCase, skipIf
+from Queue import Queue
+from time import time, sleep
+from multiprocessing.pool import ThreadPool
+from mock import Mock, ANY, patch
 from nose.tools import raises
 from radar.check import CheckError
-from radar.check_manager import CheckManager
+from radar.check_manager import CheckManager, CheckManagerError
+from radar.check_manager.exec_server import ExecServer
+from radar.misc import WakeupQueue
+from radar.platform_setup import Platform
 from radar.protocol import Message
 
 
@@ -35,19 +41,26 @@ class TestCheckManager(TestCase):
             'connect': {
                 'to': ANY,
                 'port': ANY,
-            }
+            },
+            'run as': {
+                'user': 'radar',
+                'group': 'radar',
+            },
+            'check workers': 2,
+            'cache ttl': 0,
+            'exec server': False,
         }
 
     def test_process_message_fails_due_to_invalid_message_type(self):
         check_manager = CheckManager(self.platform_setup, Mock(), Mock())
         check_manager._logger = Mock()
-        check_manager._process_message(max(Message.TYPE.values()) + 1, [{}])
+        check_manager._process_message(max(Message.TYPE.values()) + 1, [{}], True)
         check_manager._logger.log.assert_called_with(ANY)
 
     def test_process_message_fails_due_to_invalid_check_sent_from_server(self):
         check_manager = CheckManager(self.platform_setup, Mock(), Mock())
         check_manager._logger = Mock()
-        check_manager._process_message(Message.TYPE['CHECK'], [{}])
+        check_manager._process_message(Message.TYPE['CHECK'], [{}], True)
         # TODO: Fix to assert a CheckError instance is passed to 'log'. Why does this fail ?
         # check_manager._logger.log.assert_called_with(CheckError('Error - Server sent empty or invalid check.'))
         check_manager._logger.log.assert_called_with(ANY)
@@ -56,3 +69,104 @@ class TestCheckManager(TestCase):
     def test_build_checks_raises_check_error(self):
         check_manager = CheckManager(self.platform_setup, Mock(), Mock())
         check_manager._build_checks([{}])
+
+    @raises(CheckManagerError)
+    def test_invalid_number_of_check_workers_raises_error(self):
+        self.platform_setup.config['check workers'] = 0
+        CheckManager(self.platform_setup, Mock(), Mock())
+
+    @skipIf(Platform.get_platform_type() != 'UNIX', 'Unix only test.')
+    def test_checks_are_given_the_exec_server(self):
+        self.platform_setup.config['exec server'] = True
+        check_manager = CheckManager(self.platform_setup, Mock(), Mock())
+        check = check_manager._build_checks([{'id': 1, 'path': 'dummy.py'}]).pop()
+        self.assertTrue(isinstance(check._exec_server, ExecServer))
+
+    def test_exec_server_can_be_disabled(self):
+        check_manager = CheckManager(self.platform_setup, Mock(), Mock())
+        self.assertEqual(check_manager._exec_server, None)
+
+    @raises(CheckError)
+    def test_schedule_without_interval_is_rejected(self):
+        check_manager = CheckManager(self.platform_setup, Mock(), Mock())
+        check_manager._on_schedule([{'id': 1, 'path': 'dummy.py'}], True)
+
+    def test_scheduled_checks_run_on_their_own(self):
+        input_queue, output_queue = WakeupQueue(), Queue()
+        check_manager = CheckManager(self.platform_setup, input_queue, output_queue)
+        check_manager._build_checks = lambda checks: [self._build_check(c['id'], 0) for c in checks]
+        check_manager.start()
+        input_queue.put({'message_type': Message.TYPE['SCHEDULE'], 'message': [{'id': 1, 'interval': 0.1}],
+                         'last': True})
+        replies = [output_queue.get(timeout=2) for _ in range(3)]
+        check_manager.stop_event.set()
+        input_queue.put(None)
+        check_manager.join(2)
+        self.assertEqual(replies, [[{'id': 1, 'status': 0}]] * 3)
+
+    def test_waiting_for_the_next_scheduled_check_does_not_poll(self):
+        input_queue = WakeupQueue()
+        check_manager = CheckManager(self.platform_setup, input_queue, Mock())
+        check_manager._scheduler.get_timeout = Mock(return_value=0.3)
+
+        with patch('threading._sleep') as sleep:
+            start = time()
+            self.assertEqual(check_manager._get_message(), None)
+            self.assertTrue(time() - start >= 0.3)
+            input_queue.put('message')
+            self.assertEqual(check_manager._get_message(), 'message')
+
+        self.assertFalse(sleep.called)
+
+    def test_schedule_is_only_replaced_once_all_its_parts_arrive(self):
+        check_manager = CheckManager(self.platform_setup, Mock(), Mock())
+        check_manager._scheduler = Mock()
+        check_manager._on_schedule([{'id': 1, 'path': 'a.py', 'interval': 10}], False)
+        check_manager._on_schedule([{'id': 2, 'path': 'b.py', 'interval': 10}], False)
+        self.assertFalse(check_manager._scheduler.set.called)
+        check_manager._on_schedule([{'id': 3, 'path': 'c.py', 'interval': 10}], True)
+        check_manager._scheduler.set.assert_called_once_with([
+            {'id': 1, 'path': 'a.py', 'interval': 10},
+            {'id': 2, 'path': 'b.py', 'interval': 10},
+            {'id': 3, 'path': 'c.py', 'interval': 10},
+        ])
+
+    def _build_check(self, id, duration):
+        check = Mock()
+        check.run.side_effect = lambda: sleep(duration) or check
+        check.to_check_reply_dict.return_value = {'id': id, 'status': 0}
+        check.get_ttl.return_value = 0
+        return check
+
+    def test_checks_run_concurrently_and_replies_are_sent_as_they_finish(self):
+        output_queue = Queue()
+        check_manager = CheckManager(self.platform_setup, Mock(), output_queue)
+        check_manager._pool = ThreadPool(2)
+        start = time()
+        check_manager._run_checks([self._build_check(1, 0.5), self._build_check(2, 0.1)])
+        replies = [output_queue.get(timeout=2) for _ in range(2)]
+        check_manager._pool.terminate()
+        self.assertTrue(time() - start < 0.9)
+        self.assertEqual(replies, [[{'id': 2, 'status': 0}], [{'id': 1, 'status': 0}]])
+
+    def test_check_that_blows_up_is_logged_and_replied_with_error(self):
+        output_queue = Queue()
+        check_manager = CheckManager(self.platform_setup, Mock(), output_queue)
+        check_manager._logger = Mock()
+        check = check_manager._build_checks([{'id': 1, 'path': 'dummy.py'}]).pop()
+
+        with patch.object(type(check), '_execute', side_effect=ValueError('unexpected')):
+            check_manager._on_check_run(check)
+
+        check_manager._logger.log.assert_called_once_with(ANY)
+        self.assertEqual(output_queue.get_nowait(), [{'id': 1, 'status': check.STATUS['ERROR'],
+                                                      'details': 'unexpected'}])
+
+    def test_check_manager_stops_when_woken_up(self):
+        input_queue = WakeupQueue()
+        check_manager = CheckManager(self.platform_setup, input_queue, Mock())
+        check_manager.start()
+        check_manager.stop_event.set()
+        input_queue.put(None)
+        check_manager.join(2)
+        self.assertFalse(check_manager.is_alive())
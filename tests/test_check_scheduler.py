@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from time import sleep
+from radar.check_manager.check_scheduler import CheckScheduler
+
+
+class TestCheckScheduler(TestCase):
+    def setUp(self):
+        self.scheduler = CheckScheduler()
+        self.checks = [{'id': 1, 'path': 'fast', 'interval': 0.1}, {'id': 2, 'path': 'slow', 'interval': 10}]
+
+    def test_empty_scheduler_has_no_timeout(self):
+        self.assertEqual(self.scheduler.get_timeout(), None)
+        self.assertEqual(self.scheduler.get_due(), [])
+
+    def test_all_checks_are_due_after_set(self):
+        self.scheduler.set(self.checks)
+        self.assertEqual(self.scheduler.get_timeout(), 0)
+        self.assertEqual(sorted(self.scheduler.get_due()), sorted(self.checks))
+
+    def test_checks_run_at_their_intervals(self):
+        self.scheduler.set(self.checks)
+        self.scheduler.get_due()
+        self.assertEqual(self.scheduler.get_due(), [])
+        self.assertTrue(0 < self.scheduler.get_timeout() <= 0.1)
+        sleep(0.15)
+        self.assertEqual(self.scheduler.get_due(), self.checks[:1])
+
+    def test_set_replaces_previous_schedule(self):
+        self.scheduler.set(self.checks)
+        self.scheduler.set(self.checks[1:])
+        self.assertEqual(self.scheduler.get_due(), self.checks[1:])
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock
+from radar.check import Check
+from radar.client_manager import ClientManager, MonitorIndex
+from radar.misc import Address, AddressRange
+from radar.monitor import Monitor
+from radar.network.client import Client
+from radar.protocol import Message
+
+
+class DummyClient(Client):
+    def __init__(self, *args, **kwargs):
+        super(DummyClient, self).__init__(*args, **kwargs)
+        self.send_message = Mock()
+
+    def on_receive(self):
+        pass
+
+
+class TestClientManagerPushMode(TestCase):
+    def setUp(self):
+        self.checks = [
+            Check(name='Load average', path='load_average', interval=10),
+            Check(name='Uptime', path='uptime'),
+        ]
+        self.server_setup = Mock()
+        self.server_setup.config = {'push mode': True, 'polling time': 60}
+        self.server_setup.monitors = [
+            Monitor(addresses=[AddressRange('192.168.0.1 - 192.168.0.100')], checks=self.checks[:1]),
+            Monitor(addresses=[AddressRange('192.168.0.1 - 192.168.0.10')], checks=self.checks[1:]),
+        ]
+        self.client = DummyClient(address='192.168.0.1', port=10000)
+        self.client_manager = ClientManager(self.server_setup)
+
+    def _get_sent_schedule(self):
+        message_type, schedule = self.client.send_message.call_args[0]
+        self.assertEqual(message_type, Message.TYPE['SCHEDULE'])
+        return sorted(schedule, key=lambda c: c['path'])
+
+    def test_schedule_is_sent_on_register(self):
+        self.client_manager.register(self.client)
+        self.assertEqual(self._get_sent_schedule(), [
+            {'id': self.checks[0].id, 'path': 'load_average', 'interval': 10},
+            {'id': self.checks[1].id, 'path': 'uptime', 'interval': 60},
+        ])
+
+    def test_poll_only_sends_changed_schedules(self):
+        self.client_manager.register(self.client)
+        self.client_manager.poll()
+        self.assertEqual(self.client.send_message.call_count, 1)
+        self.checks[1].enabled = False
+        self.client_manager.poll()
+        self.assertEqual(self.client.send_message.call_count, 2)
+        self.assertEqual([c['path'] for c in self._get_sent_schedule()], ['load_average'])
+
+    def test_poll_sends_checks_if_not_in_push_mode(self):
+        self.server_setup.config['push mode'] = False
+        client_manager = ClientManager(self.server_setup)
+        client_manager.register(self.client)
+        client_manager.poll()
+        self.assertEqual(self.client.send_message.call_count, 2)
+        self.assertTrue(all([c[0][0] == Message.TYPE['CHECK'] for c in self.client.send_message.call_args_list]))
+
+
+class TestMonitorIndex(TestCase):
+    def setUp(self):
+        self.checks = [Check(name='Uptime', path='uptime')]
+        self.monitors = [
+            Monitor(addresses=[AddressRange('10.0.0.1 - 10.0.0.100')], checks=self.checks),
+            Monitor(addresses=[AddressRange('10.0.0.50 - 10.0.1.255'), Address('192.168.0.1')], checks=self.checks),
+            Monitor(addresses=[Address('10.0.0.75')], checks=self.checks),
+        ]
+        self.index = MonitorIndex(self.monitors)
+
+    def _get(self, address):
+        return [self.monitors.index(m) for m in self.index.get(address)]
+
+    def test_address_outside_every_range(self):
+        self.assertEqual(self._get('10.0.0.0'), [])
+        self.assertEqual(self._get('10.0.2.0'), [])
+        self.assertEqual(self._get('192.168.0.2'), [])
+
+    def test_address_on_range_bounds(self):
+        self.assertEqual(self._get('10.0.0.1'), [0])
+        self.assertEqual(self._get('10.0.0.100'), [0, 1])
+        self.assertEqual(self._get('10.0.0.101'), [1])
+        self.assertEqual(self._get('10.0.1.255'), [1])
+
+    def test_overlapping_monitors(self):
+        self.assertEqual(self._get('10.0.0.75'), [0, 1, 2])
+        self.assertEqual(self._get('10.0.0.76'), [0, 1])
+
+    def test_single_address(self):
+        self.assertEqual(self._get('192.168.0.1'), [1])
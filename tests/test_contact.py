@@ -49,3 +49,6 @@ class TestContact(TestCase):
     def test_check_as_list(self):
         self.assertEqual(type(self.contact.as_list()), list)
         self.assertEqual(len(self.contact.as_list()), 1)
+
+    def test_contact_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.contact, '__dict__'))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase, skipIf
+from nose.tools import raises
+from os import chmod, close, kill, remove
+from tempfile import mkstemp
+from threading import Thread
+from time import time
+from radar.check import CheckError, CheckTimeoutError
+from radar.check_manager.exec_server import ExecServer
+from radar.platform_setup import Platform
+
+
+@skipIf(Platform.get_platform_type() != 'UNIX', 'Unix only test.')
+class TestExecServer(TestCase):
+    def setUp(self):
+        fd, self.path = mkstemp()
+        close(fd)
+
+        with open(self.path, 'w') as f:
+            f.write('#!/bin/sh\nsleep $1\necho "{\\"status\\": \\"OK\\", \\"details\\": \\"$1\\"}"\n')
+
+        chmod(self.path, 0700)
+        self.exec_server = ExecServer()
+
+    def tearDown(self):
+        self.exec_server.stop()
+        remove(self.path)
+
+    def test_run_returns_check_output(self):
+        self.assertEqual(self.exec_server.run([self.path, '0'], 10), '{"status": "OK", "details": "0"}\n')
+
+    def test_checks_run_concurrently(self):
+        outputs = []
+        threads = [Thread(target=lambda: outputs.append(self.exec_server.run([self.path, '0.5'], 10)))
+                   for _ in range(4)]
+        start = time()
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertTrue(time() - start < 1.5)
+        self.assertEqual(len(outputs), 4)
+
+    def test_check_reading_standard_input_does_not_steal_requests(self):
+        fd, reader_path = mkstemp()
+        close(fd)
+        self.addCleanup(remove, reader_path)
+
+        with open(reader_path, 'w') as f:
+            f.write('#!/bin/sh\nread line\nsleep 0.5\necho "{\\"status\\": \\"OK\\", \\"details\\": \\"$line\\"}"\n')
+
+        chmod(reader_path, 0700)
+        outputs = []
+        reader = Thread(target=lambda: outputs.append(self.exec_server.run([reader_path], 5)))
+        reader.start()
+        self.assertEqual(self.exec_server.run([self.path, '0.2'], 5), '{"status": "OK", "details": "0.2"}\n')
+        reader.join()
+        self.assertEqual(outputs, ['{"status": "OK", "details": ""}\n'])
+
+    def test_check_is_killed_when_it_times_out(self):
+        start = time()
+        self.assertRaises(CheckTimeoutError, self.exec_server.run, [self.path, '5'], 0.2)
+        self.assertTrue(time() - start < 2)
+
+    @raises(CheckError)
+    def test_run_raises_check_error_if_check_does_not_exist(self):
+        self.exec_server.run([self.path + '.missing'], 10)
+
+    def test_exec_server_is_restarted(self):
+        self.exec_server.run([self.path, '0'], 10)
+        self.exec_server._process.kill()
+        self.exec_server._process.wait()
+        self.assertEqual(self.exec_server.run([self.path, '0'], 10), '{"status": "OK", "details": "0"}\n')
+
+    def test_run_does_not_wait_forever_on_a_stuck_exec_server(self):
+        from signal import SIGCONT, SIGSTOP
+
+        self.exec_server.run([self.path, '0'], 10)
+        self.exec_server.REPLY_GRACE = 0.2
+        kill(self.exec_server._process.pid, SIGSTOP)
+        start = time()
+
+        try:
+            self.assertRaises(CheckTimeoutError, self.exec_server.run, [self.path, '0'], 0.1)
+        finally:
+            kill(self.exec_server._process.pid, SIGCONT)
+
+        self.assertTrue(time() - start < 2)
+        self.assertEqual(self.exec_server._pending, {})
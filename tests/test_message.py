@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from nose.tools import raises
+from struct import pack
+from select import select
+from socket import socketpair
+from radar.network.client import Client, ClientDataNotReady, ClientAbortError
+from radar.protocol import Message, MessageNotReady, JSONListDecoder, BinaryCodec
+
+
+# Every chunk is handed to the receiver as it asks for data, a None chunk
+# stands for no data being available at that moment.
+class DummyClient(object):
+    def __init__(self, chunks=[]):
+        self.chunks = list(chunks)
+        self.sent = ''
+
+    def receive_into(self, buffer):
+        if not self.chunks or self.chunks[0] is None:
+            self.chunks[:1] = []
+            raise ClientDataNotReady()
+
+        chunk = self.chunks.pop(0)
+        received = chunk[:len(buffer)]
+        buffer[:len(received)] = received
+
+        if len(received) < len(chunk):
+            self.chunks.insert(0, chunk[len(received):])
+
+        return len(received)
+
+    def write(self, data):
+        self.sent += data
+        return len(data)
+
+
+class DummyNetworkClient(Client):
+    def on_receive(self):
+        pass
+
+
+class TestMessage(TestCase):
+    def setUp(self):
+        self.message = Message()
+
+    def _pack(self, message_type, payload, message_options=Message.OPTIONS['NONE']):
+        return pack('!BBH', message_type, message_options, len(payload)) + payload
+
+    def _receive_all(self, client):
+        received = []
+
+        while client.chunks or self.message.pending():
+            try:
+                received.append(self.message.receive(client))
+            except MessageNotReady:
+                pass
+
+        return received
+
+    def _receive_parts(self, client):
+        return [elements for _, elements, _ in self._receive_all(client)]
+
+    def test_message_is_received(self):
+        client = DummyClient([self._pack(Message.TYPE['CHECK'], '[{"id": 1}]')])
+        self.assertEqual(self.message.receive(client), (Message.TYPE['CHECK'], [{'id': 1}], True))
+
+    def test_message_is_received_in_fragments(self):
+        packed = self._pack(Message.TYPE['CHECK REPLY'], '[{"id": 1}]')
+        client = DummyClient([packed[:2], None, packed[2:7], None, packed[7:]])
+
+        for _ in range(2):
+            self.assertRaises(MessageNotReady, self.message.receive, client)
+
+        self.assertEqual(self.message.receive(client), (Message.TYPE['CHECK REPLY'], [{'id': 1}], True))
+
+    def test_several_messages_are_received_from_a_single_read(self):
+        payloads = ['[{:}]'.format(n) for n in range(3)]
+        client = DummyClient([''.join([self._pack(Message.TYPE['CHECK'], p) for p in payloads])])
+        received = [self.message.receive(client)[1]]
+
+        while self.message.pending():
+            received.append(self.message.receive(client)[1])
+
+        self.assertEqual(received, [[0], [1], [2]])
+        self.assertRaises(MessageNotReady, self.message.receive, client)
+
+    def test_message_larger_than_the_buffer_is_received(self):
+        payload = '["' + 'x' * (Message.BUFFER_SIZE * 3) + '"]'
+        packed = self._pack(Message.TYPE['CHECK'], payload)
+        client = DummyClient([packed[:10], None, packed[10:]])
+        self.assertRaises(MessageNotReady, self.message.receive, client)
+        self.assertEqual(self.message.receive(client),
+                         (Message.TYPE['CHECK'], ['x' * (Message.BUFFER_SIZE * 3)], True))
+
+    def test_frame_larger_than_the_buffer_is_read_at_once(self):
+        payload = '["' + 'x' * (Message.BUFFER_SIZE * 3) + '"]'
+        client = DummyClient([self._pack(Message.TYPE['CHECK'], payload)])
+        self.assertEqual(self.message.receive(client),
+                         (Message.TYPE['CHECK'], ['x' * (Message.BUFFER_SIZE * 3)], True))
+
+    def test_buffer_shrinks_once_consumed(self):
+        payload = '["' + 'x' * (Message.BUFFER_SIZE * 3) + '"]'
+        client = DummyClient([self._pack(Message.TYPE['CHECK'], payload)])
+        self.message.receive(client)
+        self.assertEqual(len(self.message._buffer), Message.BUFFER_SIZE)
+
+    def test_socket_is_drained_until_it_would_block(self):
+        local, peer = socketpair()
+        local.setblocking(0)
+        self.addCleanup(peer.close)
+        client = DummyNetworkClient('localhost', 0, socket=local, blocking_socket=False)
+        self.addCleanup(client.disconnect)
+        replies = [{'id': n, 'status': 0, 'details': 'dummy details'} for n in range(400)]
+        Message().send(DummyNetworkClient('localhost', 0, socket=peer), Message.TYPE['CHECK REPLY'], replies)
+        received = []
+
+        try:
+            while True:
+                received += self.message.receive(client)[1]
+        except MessageNotReady:
+            pass
+
+        self.assertEqual(received, replies)
+        self.assertEqual(select([local], [], [], 0)[0], [])
+
+    @raises(ClientAbortError)
+    def test_message_with_invalid_type_aborts(self):
+        self.message.receive(DummyClient([self._pack(max(Message.TYPE.values()) + 1, '[]')]))
+
+    @raises(ClientAbortError)
+    def test_message_with_invalid_options_aborts(self):
+        self.message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], '[]', Message.OPTIONS_MASK + 1)]))
+
+    @raises(ClientAbortError)
+    def test_empty_message_aborts(self):
+        self.message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], '')]))
+
+    @raises(ClientAbortError)
+    def test_invalid_json_aborts(self):
+        self.message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], '[{"id": }]')]))
+
+    def test_message_is_sent(self):
+        client = DummyClient()
+        self.message.send(client, Message.TYPE['CHECK'], [])
+        self.assertEqual(client.sent, self._pack(Message.TYPE['CHECK'], '[]'))
+
+    def test_long_message_is_sent_in_several_frames(self):
+        client = DummyClient()
+        message = [{'id': n, 'path': 'x' * 100} for n in range(2000)]
+        self.message.send(client, Message.TYPE['CHECK'], message)
+        self.assertTrue(ord(client.sent[1]) & Message.OPTIONS['CONTINUED'])
+        client.chunks = [client.sent[n:n + 1000] for n in range(0, len(client.sent), 1000)]
+        self.assertEqual(sum(self._receive_parts(client), []), message)
+
+    def test_long_message_is_received_in_parts(self):
+        client = DummyClient()
+        message = [{'id': n, 'path': 'x' * 100} for n in range(2000)]
+        self.message.send(client, Message.TYPE['CHECK'], message)
+        client.chunks = [client.sent]
+        parts = self._receive_parts(client)
+        self.assertTrue(len(parts) > 1)
+        self.assertEqual(sum(parts, []), message)
+
+    def test_only_the_last_part_of_a_long_message_is_marked_as_last(self):
+        client = DummyClient()
+        message = [{'id': n, 'path': 'x' * 100, 'interval': 60} for n in range(2000)]
+        self.message.send(client, Message.TYPE['SCHEDULE'], message)
+        client.chunks = [client.sent]
+        parts = self._receive_all(client)
+        self.assertTrue(len(parts) > 1)
+        self.assertEqual([p[2] for p in parts], [False] * (len(parts) - 1) + [True])
+        self.assertEqual(sum([p[1] for p in parts], []), message)
+
+    # A message that already knows its peer supports compression.
+    def _build_compressing_message(self, **kwargs):
+        message = Message(compress=True, **kwargs)
+        message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], '[]', Message.OPTIONS['ACCEPT COMPRESS'])]))
+        return message
+
+    def test_messages_advertise_compression(self):
+        client = DummyClient()
+        Message(compress=True).send(client, Message.TYPE['CHECK REPLY'], [])
+        self.assertEqual(client.sent, self._pack(Message.TYPE['CHECK REPLY'], '[]', Message.OPTIONS['ACCEPT COMPRESS']))
+
+    def test_messages_are_not_compressed_until_peer_supports_it(self):
+        client = DummyClient()
+        Message(compress=True).send(client, Message.TYPE['CHECK REPLY'], [{'id': n, 'status': 0} for n in range(100)])
+        self.assertFalse(ord(client.sent[1]) & Message.OPTIONS['COMPRESS'])
+
+    def test_small_messages_are_not_compressed(self):
+        client = DummyClient()
+        self._build_compressing_message().send(client, Message.TYPE['CHECK REPLY'], [])
+        self.assertEqual(client.sent, self._pack(Message.TYPE['CHECK REPLY'], '[]', Message.OPTIONS['ACCEPT COMPRESS']))
+
+    def test_compressed_message_is_received(self):
+        message = [{'id': n, 'status': 0} for n in range(100)]
+        client = DummyClient()
+        self._build_compressing_message().send(client, Message.TYPE['CHECK REPLY'], message)
+        self.assertTrue(ord(client.sent[1]) & Message.OPTIONS['COMPRESS'])
+        self.assertTrue(len(client.sent) < len(str(message)))
+        client.chunks = [client.sent]
+        self.assertEqual(self.message.receive(client), (Message.TYPE['CHECK REPLY'], message, True))
+
+    def test_long_compressed_message_is_received(self):
+        message = [{'id': n, 'data': str(n) * 50} for n in range(5000)]
+        client = DummyClient()
+        self._build_compressing_message().send(client, Message.TYPE['CHECK REPLY'], message)
+        client.chunks = [client.sent]
+        self.assertEqual(sum(self._receive_parts(client), []), message)
+
+    def test_receiving_a_compressed_message_enables_compression(self):
+        client = DummyClient()
+        self._build_compressing_message().send(client, Message.TYPE['CHECK REPLY'], [{'id': n} for n in range(500)])
+        client.chunks = [client.sent]
+        self.message.receive(client)
+        self.assertTrue(self.message.compress)
+        self.assertTrue(self.message._should_compress('x' * Message.COMPRESSION_THRESHOLD))
+
+    def test_advertised_compression_enables_compression(self):
+        client = DummyClient()
+        Message(compress=True).send(client, Message.TYPE['CHECK REPLY'], [])
+        client.chunks = [client.sent]
+        self.message.receive(client)
+        self.assertTrue(self.message._should_compress('x' * Message.COMPRESSION_THRESHOLD))
+
+    @raises(ClientAbortError)
+    def test_corrupt_compressed_message_aborts(self):
+        self.message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], '[]', Message.OPTIONS['COMPRESS'])]))
+
+    def test_binary_message_is_received(self):
+        message = [{'id': n, 'status': n % 4 - 1, 'details': u'd\xe9tails'} for n in range(100)]
+        client = DummyClient()
+        Message(binary=True).send(client, Message.TYPE['CHECK REPLY'], message)
+        self.assertTrue(ord(client.sent[1]) & Message.OPTIONS['BINARY'])
+        client.chunks = [client.sent]
+        self.assertEqual(self.message.receive(client), (Message.TYPE['CHECK REPLY'], message, True))
+
+    def test_receiving_a_binary_message_enables_binary_encoding(self):
+        client = DummyClient()
+        Message(binary=True).send(client, Message.TYPE['CHECK REPLY'], [])
+        client.chunks = [client.sent]
+        self.message.receive(client)
+        self.assertTrue(self.message.binary)
+
+    def test_long_compressed_binary_message_is_received(self):
+        message = [{'id': n, 'path': 'x' * 100, 'args': str(n)} for n in range(5000)]
+        client = DummyClient()
+        self._build_compressing_message(binary=True).send(client, Message.TYPE['CHECK'], message)
+        client.chunks = [client.sent[n:n + 1000] for n in range(0, len(client.sent), 1000)]
+        self.assertEqual(sum(self._receive_parts(client), []), message)
+
+    @raises(ClientAbortError)
+    def test_malformed_list_split_across_frames_aborts(self):
+        client = DummyClient([
+            self._pack(Message.TYPE['CHECK'], '[{"id": 1} ', Message.OPTIONS['CONTINUED']),
+            self._pack(Message.TYPE['CHECK'], '{"id": 2}]'),
+        ])
+        self._receive_parts(client)
+
+    @raises(ClientAbortError)
+    def test_truncated_binary_message_aborts(self):
+        payload = BinaryCodec().encode([{'id': 1, 'path': 'check'}])[:-1]
+        self.message.receive(DummyClient([self._pack(Message.TYPE['CHECK'], payload, Message.OPTIONS['BINARY'])]))
+
+
+class TestBinaryCodec(TestCase):
+    def setUp(self):
+        self.codec = BinaryCodec()
+
+    def _decode(self, message):
+        return self.codec.decoder().feed(self.codec.encode(message), last=True)
+
+    def test_check_dictionaries_are_encoded_and_decoded(self):
+        message = [{'id': 1, 'path': 'uptime.py', 'args': '-v'}, {'id': 2, 'status': -1, 'details': ''}]
+        self.assertEqual(self._decode(message), message)
+
+    def test_binary_encoding_is_smaller_than_json(self):
+        message = [{'id': n, 'status': 0} for n in range(100)]
+        self.assertTrue(len(self.codec.encode(message)) < len(Message.CODECS[Message.OPTIONS['NONE']].encode(message)))
+
+    def test_other_fields_are_encoded_and_decoded(self):
+        message = [{'id': 1, 'status': 0, 'data': {'load': [0.5, 0.25]}}, {'id': 2 ** 40, 'status': 1000}]
+        self.assertEqual(self._decode(message), message)
+
+    def test_elements_that_are_not_dictionaries_are_encoded_and_decoded(self):
+        self.assertEqual(self._decode([1, 'two', None, [3]]), [1, 'two', None, [3]])
+
+    def test_empty_list_is_encoded_and_decoded(self):
+        self.assertEqual(self._decode([]), [])
+
+    def test_elements_are_decoded_as_they_arrive(self):
+        message = [{'id': n, 'path': 'check'} for n in range(3)]
+        encoded = self.codec.encode(message)
+        decoder = self.codec.decoder()
+        half = len(encoded) / 2
+        self.assertEqual(decoder.feed(encoded[:half]) + decoder.feed(encoded[half:], last=True), message)
+
+    @raises(ValueError)
+    def test_incomplete_list_raises_error(self):
+        self.codec.decoder().feed(self.codec.encode([{'id': 1}])[:-1], last=True)
+
+
+class TestJSONListDecoder(TestCase):
+    def setUp(self):
+        self.decoder = JSONListDecoder()
+
+    def test_elements_are_decoded_as_they_arrive(self):
+        self.assertEqual(self.decoder.feed('[{"id": 1}, {"id"'), [{'id': 1}])
+        self.assertEqual(self.decoder.feed(': 2}, '), [{'id': 2}])
+        self.assertEqual(self.decoder.feed('{"id": 3}]', last=True), [{'id': 3}])
+
+    def test_numbers_split_across_pieces_are_decoded(self):
+        self.assertEqual(self.decoder.feed('[12'), [])
+        self.assertEqual(self.decoder.feed('34]', last=True), [1234])
+
+    def test_decimals_split_across_pieces_are_decoded(self):
+        self.assertEqual(self.decoder.feed('[23.'), [])
+        self.assertEqual(self.decoder.feed('5, 1'), [23.5])
+        self.assertEqual(self.decoder.feed('e3]', last=True), [1000.0])
+
+    def test_empty_list_is_decoded(self):
+        self.assertEqual(self.decoder.feed(' [ ] ', last=True), [])
+
+    @raises(ValueError)
+    def test_incomplete_list_raises_error(self):
+        self.decoder.feed('[1, 2', last=True)
+
+    @raises(ValueError)
+    def test_non_list_raises_error(self):
+        self.decoder.feed('{"id": 1}', last=True)
+
+    @raises(ValueError)
+    def test_missing_comma_across_pieces_raises_error(self):
+        self.decoder.feed('[1 ')
+        self.decoder.feed('2]', last=True)
+
+    @raises(ValueError)
+    def test_leading_comma_raises_error(self):
+        self.decoder.feed('[,1]', last=True)
+
+    @raises(ValueError)
+    def test_trailing_comma_across_pieces_raises_error(self):
+        self.decoder.feed('[1,')
+        self.decoder.feed(']', last=True)
+
+    @raises(ValueError)
+    def test_double_comma_across_pieces_raises_error(self):
+        self.decoder.feed('[1,')
+        self.decoder.feed(',2]', last=True)
@@ -23,7 +23,7 @@ Copyright 2015 Lucas Liendo.
 from unittest import TestCase
 from nose.tools import raises
 from radar.misc import Address, AddressRange
-from radar.check import Check, CheckGroup
+from radar.check import Check, CheckGroup, CheckError
 from radar.contact import Contact, ContactGroup
 from radar.monitor import Monitor, MonitorError
 from radar.network.client import Client
@@ -118,14 +118,16 @@ class TestMonitor(TestCase):
         check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}
         self.monitor.add_client(self.dummy_client)
         updated_checks = self.monitor.update_checks(self.dummy_client, [check_status])
-        self.assertEqual(list(self.monitor.active_clients[0]['checks']).pop().current_status, Check.STATUS['ERROR'])
+        active_client = self.monitor.active_clients[self.dummy_client.address]
+        self.assertEqual(active_client.get_check(self.checks[0]).current_status, Check.STATUS['ERROR'])
         self.assertNotEqual(updated_checks, {})
 
     def test_monitor_does_not_update_check_status(self):
         check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id + 1}
         self.monitor.add_client(self.dummy_client)
         updated_checks = self.monitor.update_checks(self.dummy_client, [check_status])
-        self.assertEqual(list(self.monitor.active_clients[0]['checks']).pop().current_status, Check.STATUS['UNKNOWN'])
+        active_client = self.monitor.active_clients[self.dummy_client.address]
+        self.assertEqual(active_client.get_check(self.checks[0]).current_status, Check.STATUS['UNKNOWN'])
         self.assertEqual(updated_checks, {})
 
     def test_monitor_to_dict(self):
@@ -139,3 +141,69 @@ class TestMonitor(TestCase):
         message = self.monitor.poll(Message.TYPE['CHECK'])
         [self.assertTrue(('path' in c) and ('id' in c)) for c in message]
         self.assertEqual(type(message), list)
+
+    def test_monitor_schedule_skips_disabled_checks(self):
+        self.checks[0].enabled = False
+        self.assertEqual(self.monitor.schedule(), [])
+
+    def test_monitor_does_not_update_checks_of_unknown_client(self):
+        self.assertEqual(self.monitor.update_checks(self.dummy_client, [{'id': self.checks[0].id, 'status': 0}]), {})
+
+    def test_active_clients_are_indexed_by_address(self):
+        self.monitor.add_client(self.dummy_client)
+        self.assertTrue(self.monitor.has_client(DummyClient(address='192.168.0.1', port=20000)))
+        self.assertEqual(self.monitor.active_clients['192.168.0.1'].client, self.dummy_client)
+
+    def test_monitor_updates_checks_of_check_groups(self):
+        check = Check(name='Uptime', path='uptime')
+        check_group = CheckGroup(name='check group', checks=[check])
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[check_group, self.checks[0]])
+        monitor.add_client(self.dummy_client)
+        updated = monitor.update_checks(self.dummy_client, [
+            {'id': check.id, 'status': Check.STATUS['OK']},
+            {'id': self.checks[0].id, 'status': Check.STATUS['WARNING']},
+        ])
+        self.assertEqual(updated['checks'], set([check_group, self.checks[0]]))
+        active_client = monitor.active_clients[self.dummy_client.address]
+        self.assertEqual(active_client.get_check(check).current_status, Check.STATUS['OK'])
+
+    def test_monitor_updates_are_not_shared_among_clients(self):
+        another_client = DummyClient(address='192.168.0.2', port=10000)
+        check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}
+        self.monitor.add_client(self.dummy_client)
+        self.monitor.add_client(another_client)
+        self.monitor.update_checks(self.dummy_client, [check_status])
+        self.assertEqual(self.checks[0].current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(self.monitor.active_clients['192.168.0.2'].get_check(self.checks[0]).current_status,
+                         Check.STATUS['UNKNOWN'])
+
+    def test_monitor_reports_client_checks(self):
+        check = Check(name='Uptime', path='uptime')
+        check_group = CheckGroup(name='check group', checks=[check])
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[check_group])
+        monitor.add_client(self.dummy_client)
+        updated = monitor.update_checks(self.dummy_client, [{'id': check.id, 'status': Check.STATUS['OK']}])
+        self.assertEqual([c.current_status for c in list(updated['checks']).pop().as_list()], [Check.STATUS['OK']])
+        self.assertTrue(list(updated['checks']).pop() is monitor.active_clients['192.168.0.1'].get(check_group))
+
+    def test_active_client_to_dict_contains_client_status(self):
+        self.monitor.add_client(self.dummy_client)
+        self.monitor.update_checks(self.dummy_client, [{'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}])
+        d = self.monitor.active_clients[self.dummy_client.address].to_dict()
+        self.assertEqual(d['checks'][0]['current_status'], Check.STATUS['ERROR'])
+
+    def test_active_client_to_dict_contains_client_check_group_status(self):
+        check = Check(name='Uptime', path='uptime')
+        check_group = CheckGroup(name='check group', checks=[check])
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[check_group])
+        monitor.add_client(self.dummy_client)
+        monitor.update_checks(self.dummy_client, [{'id': check.id, 'status': Check.STATUS['OK']}])
+        d = monitor.active_clients['192.168.0.1'].to_dict()
+        self.assertEqual(d['checks'][0]['name'], 'check group')
+        self.assertEqual(d['checks'][0]['checks'][0]['current_status'], Check.STATUS['OK'])
+        self.assertEqual(check.current_status, Check.STATUS['UNKNOWN'])
+
+    @raises(CheckError)
+    def test_monitor_raises_check_error_due_to_missing_check_id(self):
+        self.monitor.add_client(self.dummy_client)
+        self.monitor.update_checks(self.dummy_client, [{'status': Check.STATUS['OK']}])
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from nose.tools import raises
+from mock import Mock
+from socket import socketpair
+from radar.network.client import Client, ClientSendError
+
+
+class DummyClient(Client):
+    def on_receive(self):
+        pass
+
+
+class TestClientWrite(TestCase):
+    def setUp(self):
+        local, self.peer = socketpair()
+        local.setblocking(0)
+        self.peer.setblocking(0)
+        self.network_monitor = Mock()
+        self.client = DummyClient('localhost', 0, socket=local, blocking_socket=False,
+                                  network_monitor=self.network_monitor)
+
+    def tearDown(self):
+        self.peer.close()
+
+    def _read_peer(self):
+        data = ''
+
+        try:
+            while True:
+                data += self.peer.recv(65536)
+        except Exception:
+            pass
+
+        return data
+
+    def test_data_is_sent_right_away(self):
+        self.client.write('data')
+        self.assertFalse(self.client.write_pending())
+        self.assertFalse(self.network_monitor.on_write_pending.called)
+        self.assertEqual(self._read_peer(), 'data')
+
+    def test_data_that_does_not_fit_is_kept_until_flushed(self):
+        data = ''.join([chr(n % 256) for n in range(4 * 1024 ** 2)])
+        self.client.write(data)
+        self.assertTrue(self.client.write_pending())
+        self.network_monitor.on_write_pending.assert_called_once_with(self.client)
+        received = ''
+
+        while self.client.write_pending():
+            received += self._read_peer()
+            self.client.flush()
+
+        received += self._read_peer()
+        self.assertEqual(received, data)
+        self.network_monitor.on_write_done.assert_called_with(self.client)
+
+    def test_disconnection_discards_pending_data(self):
+        self.client.write('x' * 4 * 1024 ** 2)
+        self.client.disconnect()
+        self.assertFalse(self.client.write_pending())
+
+    @raises(ClientSendError)
+    def test_writing_to_a_disconnected_client_raises_error(self):
+        self.client.disconnect()
+        self.client.write('data')
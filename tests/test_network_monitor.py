@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock
+from radar.network.monitor.select_monitor import SelectMonitor
+
+
+class TestNetworkMonitor(TestCase):
+    def setUp(self):
+        self.network_monitor = SelectMonitor(Mock(), 0)
+        self.clients = [self._build_client(fd) for fd in [10, 11, 12]]
+        [self.network_monitor.on_connect(c) for c in self.clients]
+
+    def _build_client(self, fd):
+        client = Mock()
+        client.socket.fileno.return_value = fd
+        return client
+
+    def test_ready_clients_are_looked_up_by_fd(self):
+        self.assertEqual(self.network_monitor._ready_clients([12, 10]), [self.clients[2], self.clients[0]])
+
+    def test_unknown_fds_are_ignored(self):
+        self.assertEqual(self.network_monitor._ready_clients([13]), [])
+
+    def test_disconnected_client_is_not_ready(self):
+        self.network_monitor.on_disconnect(self.clients[1])
+        self.assertEqual(self.network_monitor._ready_clients([10, 11, 12]), [self.clients[0], self.clients[2]])
+
+    def test_edge_triggered_is_ignored_when_not_supported(self):
+        self.assertFalse(SelectMonitor(Mock(), 0, edge_triggered=True).edge_triggered)
+
+    def test_pending_writes_are_watched_until_done(self):
+        self.network_monitor.on_write_pending(self.clients[0])
+        self.assertEqual(self.network_monitor._writers, set([10]))
+        self.network_monitor.on_write_done(self.clients[0])
+        self.assertEqual(self.network_monitor._writers, set())
+
+    def test_disconnected_client_is_not_watched_for_writes(self):
+        self.network_monitor.on_write_pending(self.clients[0])
+        self.network_monitor.on_disconnect(self.clients[0])
+        self.network_monitor.on_write_pending(self.clients[0])
+        self.assertEqual(self.network_monitor._writers, set())
+
+    def test_writable_clients_are_flushed(self):
+        self.network_monitor._watch([], [11])
+        self.network_monitor._server._flush_clients.assert_called_once_with([self.clients[1]])
+        self.assertFalse(self.network_monitor._server.on_timeout.called)
+
+    def test_client_without_socket_is_not_watched_for_writes(self):
+        self.clients[0].socket = None
+        self.network_monitor.on_write_pending(self.clients[0])
+        self.network_monitor.on_write_done(self.clients[0])
+        self.assertEqual(self.network_monitor._writers, set())
+
+    def test_client_that_fails_to_register_is_not_watched_for_writes(self):
+        self.network_monitor._register_writer = Mock(side_effect=IOError())
+        self.network_monitor.on_write_pending(self.clients[0])
+        self.assertEqual(self.network_monitor._writers, set())
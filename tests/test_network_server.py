@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from nose.tools import raises
+from mock import Mock
+from socket import socketpair
+from threading import Thread
+from radar.network.client import Client
+from radar.network.server import Server, ServerAcceptNotReady, ServerError
+
+
+class DummyServer(Server):
+    def on_receive(self, client):
+        pass
+
+
+class DummyClient(Client):
+    def on_receive(self):
+        pass
+
+
+class TestServerAccept(TestCase):
+    def _build_server(self, blocking_socket=False, max_accepts=3):
+        server = DummyServer('127.0.0.1', 0, network_monitor=Mock(), blocking_socket=blocking_socket,
+                             max_accepts=max_accepts)
+        self.addCleanup(server.socket.close)
+        server._on_accept = Mock()
+        return server
+
+    def test_accepts_are_capped_per_cycle(self):
+        server = self._build_server()
+        server._accept = Mock(side_effect=lambda: Mock())
+        server._accept_clients()
+        self.assertEqual(server._accept.call_count, 3)
+        self.assertEqual(server._on_accept.call_count, 3)
+
+    def test_accepts_stop_when_no_client_is_waiting(self):
+        server = self._build_server()
+        server._accept = Mock(side_effect=[Mock(), ServerAcceptNotReady()])
+        server._accept_clients()
+        self.assertEqual(server._accept.call_count, 2)
+        self.assertEqual(server._on_accept.call_count, 1)
+
+    def test_blocking_socket_accepts_a_single_client(self):
+        server = self._build_server(blocking_socket=True)
+        server._accept = Mock(side_effect=lambda: Mock())
+        server._accept_clients()
+        self.assertEqual(server.max_accepts, 1)
+        self.assertEqual(server._accept.call_count, 1)
+
+    @raises(ServerError)
+    def test_server_raises_error_if_max_accepts_is_zero(self):
+        self._build_server(max_accepts=0)
+
+    @raises(ServerError)
+    def test_server_raises_error_if_max_accepts_is_not_an_integer(self):
+        self._build_server(max_accepts='128')
+
+
+class TestServerDisconnect(TestCase):
+    def setUp(self):
+        self.network_monitor = Mock()
+        self.server = DummyServer('127.0.0.1', 0, network_monitor=self.network_monitor, blocking_socket=False)
+        self.addCleanup(self.server.socket.close)
+        local, self.peer = socketpair()
+        self.addCleanup(self.peer.close)
+        self.client = DummyClient('localhost', 0, socket=local, blocking_socket=False, network_monitor=self.network_monitor)
+        self.server._on_connect(self.client)
+
+    # Tells whether another thread (e.g. a poller writing to the client) could
+    # take the client's write lock.
+    def _write_lock_is_free(self):
+        acquired = []
+
+        def acquire():
+            acquired.append(self.client.write_lock.acquire(False))
+
+            if acquired[0]:
+                self.client.write_lock.release()
+
+        thread = Thread(target=acquire)
+        thread.start()
+        thread.join()
+
+        return acquired[0]
+
+    def test_client_is_unregistered_holding_its_write_lock(self):
+        self.network_monitor.on_disconnect.side_effect = lambda c: self.assertFalse(self._write_lock_is_free())
+        self.server.disconnect(self.client)
+        self.assertEqual(self.network_monitor.on_disconnect.call_count, 1)
+        self.assertFalse(self.client.is_connected())
+
+    def test_aborted_client_is_unregistered_holding_its_write_lock(self):
+        self.network_monitor.on_disconnect.side_effect = lambda c: self.assertFalse(self._write_lock_is_free())
+        self.server._on_abort(self.client)
+        self.assertEqual(self.network_monitor.on_disconnect.call_count, 1)
+        self.assertFalse(self.client.is_connected())
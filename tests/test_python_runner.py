@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase, skipIf
+from nose.tools import raises
+from os import close, dup2, remove
+from tempfile import mkstemp
+from time import time
+from radar.check import CheckError, CheckTimeoutError
+from radar.check_manager.python_runner import PythonCheckRunner
+from radar.platform_setup import Platform
+
+
+class TestPythonCheckRunner(TestCase):
+
+    CHECK = '\n'.join([
+        'from os import fstat',
+        'from time import sleep',
+        'runs = 0',
+        '',
+        'def run(args):',
+        '    global runs',
+        '    runs += 1',
+        '',
+        '    if args == [\'sleep\']:',
+        '        sleep(5)',
+        '',
+        '    if args == [\'fail\']:',
+        '        raise Exception(\'failed\')',
+        '',
+        '    if args[:1] == [\'fstat\']:',
+        '        try:',
+        '            fstat(int(args[1]))',
+        '        except OSError:',
+        '            return {\'status\': \'OK\', \'details\': \'closed\'}',
+        '',
+        '    print \'garbage\'',
+        '',
+        '    return {\'status\': \'OK\', \'details\': str(runs), \'data\': args}',
+    ])
+
+    def _write_check(self, check):
+        with open(self.path, 'w') as f:
+            f.write(check)
+
+    def setUp(self):
+        fd, self.path = mkstemp(suffix='.py')
+        close(fd)
+        self._write_check(self.CHECK)
+
+        self.runner = PythonCheckRunner(1)
+
+    def tearDown(self):
+        self.runner.stop()
+        remove(self.path)
+
+        try:
+            remove(self.path + 'c')
+        except OSError:
+            pass
+
+    def test_run_returns_check_output(self):
+        output = self.runner.run(self.path, ['-a', '1'], 10)
+        self.assertEqual(output, {'status': 'OK', 'details': '1', 'data': ['-a', '1']})
+
+    def test_check_module_is_imported_once(self):
+        [self.runner.run(self.path, [], 10) for _ in xrange(3)]
+        self.assertEqual(self.runner.run(self.path, [], 10)['details'], '4')
+
+    @raises(CheckError)
+    def test_run_raises_check_error_if_check_fails(self):
+        self.runner.run(self.path, ['fail'], 10)
+
+    @raises(CheckError)
+    def test_run_raises_check_error_if_module_does_not_exist(self):
+        self.runner.run(self.path + '.missing', [], 10)
+
+    def test_worker_is_replaced_after_timeout(self):
+        start = time()
+        self.assertRaises(CheckTimeoutError, self.runner.run, self.path, ['sleep'], 0.2)
+        self.assertTrue(time() - start < 2)
+        self.assertEqual(self.runner.run(self.path, [], 10)['details'], '1')
+
+    def test_check_module_is_reloaded_when_its_file_changes(self):
+        [self.runner.run(self.path, [], 10) for _ in xrange(3)]
+        self._write_check(self.CHECK + '\n\n# Changed.\n')
+        self.assertEqual(self.runner.run(self.path, [], 10)['details'], '1')
+
+    @skipIf(Platform.get_platform_type() != 'UNIX', 'Unix only test.')
+    def test_worker_does_not_inherit_file_descriptors(self):
+        fd, path = mkstemp()
+        dup2(fd, 100)
+
+        try:
+            self.assertEqual(self.runner.run(self.path, ['fstat', '100'], 10)['details'], 'closed')
+        finally:
+            close(100)
+            close(fd)
+            remove(path)
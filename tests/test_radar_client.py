@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock
+from nose.tools import raises
+from Queue import Queue
+from json import dumps as serialize_json
+from select import select
+from socket import socket, AF_INET, SOCK_DGRAM
+from radar.check import Check
+from radar.client import RadarClient, RadarClientError
+from radar.config.client import ClientConfig
+from radar.misc import WakeupQueue
+from radar.protocol import Message
+
+
+class TestRadarClient(TestCase):
+    def setUp(self):
+        self.platform_setup = Mock()
+        self.platform_setup.config = dict(ClientConfig.DEFAULT_CONFIG)
+        self.input_queue = WakeupQueue()
+
+    def _build_client(self, reply_window):
+        self.platform_setup.config['reply window'] = reply_window
+        client = RadarClient(self.platform_setup, self.input_queue, Queue())
+        client.send_message = Mock()
+        return client
+
+    def test_replies_are_coalesced_within_the_reply_window(self):
+        client = self._build_client(60)
+        self.input_queue.put([{'id': 1, 'status': 0}])
+        client.on_timeout()
+        self.input_queue.put([{'id': 2, 'status': 0}])
+        client.on_timeout()
+        self.assertFalse(client.send_message.called)
+        self.assertTrue(0 < client._get_watch_timeout() <= 60)
+        client._replies_deadline = 0
+        client.on_timeout()
+        client.send_message.assert_called_once_with(
+            Message.TYPE['CHECK REPLY'], [{'id': 1, 'status': 0}, {'id': 2, 'status': 0}])
+
+    def test_replies_are_sent_right_away_without_reply_window(self):
+        client = self._build_client(0)
+        self.input_queue.put([{'id': 1, 'status': 0}])
+        client.on_timeout()
+        client.send_message.assert_called_once_with(Message.TYPE['CHECK REPLY'], [{'id': 1, 'status': 0}])
+
+    def test_replies_are_sent_in_messages_of_at_most_max_replies(self):
+        client = self._build_client(60)
+        replies = [{'id': n, 'status': 0} for n in range(RadarClient.MAX_REPLIES * 2 + 10)]
+        self.input_queue.put(replies)
+        client.on_timeout()
+        self.assertEqual([c[0][1] for c in client.send_message.call_args_list], [
+            replies[:RadarClient.MAX_REPLIES],
+            replies[RadarClient.MAX_REPLIES:RadarClient.MAX_REPLIES * 2],
+            replies[RadarClient.MAX_REPLIES * 2:],
+        ])
+
+    def test_nothing_is_sent_without_replies(self):
+        client = self._build_client(0)
+        client.on_timeout()
+        self.assertFalse(client.send_message.called)
+
+    @raises(RadarClientError)
+    def test_invalid_reply_window_raises_error(self):
+        self._build_client(-1)
+
+
+class TestRadarClientPassiveChecks(TestCase):
+    def setUp(self):
+        platform_setup = Mock()
+        platform_setup.config = dict(ClientConfig.DEFAULT_CONFIG)
+        platform_setup.config.update({'reply window': 0, 'passive port': self._get_free_port()})
+        self.client = RadarClient(platform_setup, WakeupQueue(), Queue())
+        self.client.send_message = Mock()
+        self.client._learn_passive_checks(Message.TYPE['CHECK'], [
+            {'id': 1, 'path': 'backup', 'type': 'passive'},
+            {'id': 2, 'path': 'backup', 'type': 'passive'},
+            {'id': 3, 'path': 'uptime'},
+        ], True)
+        self.sender = socket(AF_INET, SOCK_DGRAM)
+
+    def tearDown(self):
+        self.sender.close()
+        self.client._passive_listener.close()
+
+    def _get_free_port(self):
+        s = socket(AF_INET, SOCK_DGRAM)
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+        s.close()
+        return port
+
+    def _send(self, result):
+        self.sender.sendto(serialize_json(result), self.client._passive_listener.socket.getsockname())
+        select([self.client._passive_listener], [], [], 2)
+
+    def test_passive_check_result_is_sent_for_every_matching_check(self):
+        self._send({'check': 'backup', 'Status': 'warning', 'details': 'slow'})
+        self.client.on_timeout()
+        message_type, replies = self.client.send_message.call_args[0]
+        self.assertEqual(message_type, Message.TYPE['CHECK REPLY'])
+        self.assertEqual(sorted(replies), [
+            {'id': 1, 'status': Check.STATUS['WARNING'], 'details': 'slow'},
+            {'id': 2, 'status': Check.STATUS['WARNING'], 'details': 'slow'},
+        ])
+
+    def test_results_of_checks_that_are_not_passive_are_discarded(self):
+        self._send({'check': 'uptime', 'status': 'OK'})
+        self.client.on_timeout()
+        self.assertFalse(self.client.send_message.called)
+
+    def test_invalid_passive_check_result_is_discarded(self):
+        self._send({'check': 'backup', 'status': 'BROKEN'})
+        self.client.on_timeout()
+        self.assertFalse(self.client.send_message.called)
+
+    def test_passive_checks_are_replaced_once_the_whole_schedule_arrives(self):
+        self.client._learn_passive_checks(Message.TYPE['SCHEDULE'], [{'id': 4, 'path': 'backup', 'type': 'passive'}],
+                                          False)
+        self.assertEqual(self.client._passive_checks, {'backup': set([1, 2])})
+        self.client._learn_passive_checks(Message.TYPE['SCHEDULE'], [{'id': 5, 'path': 'sync', 'type': 'passive'}],
+                                          True)
+        self.assertEqual(self.client._passive_checks, {'backup': set([4]), 'sync': set([5])})
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from multiprocessing import Queue as ProcessQueue
+from nose.tools import raises
+from mock import Mock, patch
+from radar.check import Check
+from radar.config.server import ServerConfig
+from radar.contact import Contact
+from radar.launcher import RadarLauncher, RadarLauncherError
+from radar.launcher.server import RadarServerLauncher
+from radar.misc import Address
+from radar.monitor import Monitor
+from radar.network.server import ServerListenError
+from radar.plugin import PluginManager
+from radar.protocol import Message
+from radar.server import RadarEventLoopServer, RadarServerShard, RadarServerWorker
+
+
+def build_platform_setup(**config):
+    platform_setup = Mock()
+    platform_setup.config = dict(ServerConfig.DEFAULT_CONFIG)
+    platform_setup.config.update({'listen': {'address': '127.0.0.1', 'port': 0}})
+    platform_setup.config.update(config)
+    platform_setup.plugins = []
+    platform_setup.monitors = []
+    return platform_setup
+
+
+class TestRadarEventLoopServer(TestCase):
+    def setUp(self):
+        self.platform_setup = build_platform_setup()
+        self.poller = Mock()
+        self.poller.polling_time = 60
+        self.plugin = Mock()
+        self.plugin.enabled = True
+        self.platform_setup.plugins = [self.plugin]
+        self.server = RadarEventLoopServer(Mock(), self.platform_setup, self.poller,
+                                           PluginManager(self.platform_setup, None))
+        self.addCleanup(self.server.socket.close)
+
+    def test_clients_are_polled_every_polling_time(self):
+        self.server._poll_clients()
+        self.server._poll_clients()
+        self.assertEqual(self.poller.poll.call_count, 1)
+
+    def test_clients_are_polled_again_once_polling_time_elapses(self):
+        self.server._poll_clients()
+        self.server._next_poll = 0
+        self.server._poll_clients()
+        self.assertEqual(self.poller.poll.call_count, 2)
+
+    def test_plugins_get_checks_and_contacts(self):
+        client = Mock(address='127.0.0.1', port=10000)
+        check = Check(name='Uptime', path='uptime')
+        contact = Contact(name='contact', email='contact@contact.com')
+        self.server._write_queue(client, Message.TYPE['CHECK REPLY'], {'checks': set([check]), 'contacts': set([contact])})
+        self.plugin.run.assert_called_once_with('127.0.0.1', 10000, Message.TYPE['CHECK REPLY'], [check], [contact])
+
+
+class TestRadarServerLauncher(TestCase):
+    def _build_launcher(self, **config):
+        platform_setup = build_platform_setup(**config)
+
+        with patch.object(RadarLauncher, '__init__', lambda launcher: setattr(launcher, '_platform_setup', platform_setup)):
+            return RadarServerLauncher()
+
+    @raises(RadarLauncherError)
+    def test_launcher_raises_error_on_unknown_engine(self):
+        self._build_launcher(engine='unknown')
+
+    def test_event_loop_engine_runs_a_single_thread(self):
+        launcher = self._build_launcher(engine='event loop')
+        self.addCleanup(launcher._threads[0].socket.close)
+        self.assertEqual(len(launcher._threads), 1)
+        self.assertTrue(isinstance(launcher._threads[0], RadarEventLoopServer))
+
+    def test_processes_engine_runs_workers_and_plugin_manager(self):
+        launcher = self._build_launcher(engine='processes', workers=3)
+        self.assertEqual([type(t) for t in launcher._threads], [RadarServerWorker] * 3 + [PluginManager])
+
+    @raises(RadarLauncherError)
+    def test_launcher_raises_error_if_no_workers(self):
+        self._build_launcher(engine='processes', workers=0)
+
+    @raises(RadarLauncherError)
+    def test_launcher_raises_error_if_workers_is_not_an_integer(self):
+        self._build_launcher(engine='processes', workers='2')
+
+
+class TestRadarServerShard(TestCase):
+    def setUp(self):
+        self.check = Check(name='Uptime', path='uptime')
+        self.contact = Contact(name='contact', email='contact@contact.com')
+        self.monitor = Monitor(addresses=[Address('127.0.0.1')], checks=[self.check], contacts=[self.contact])
+        self.client = Mock(address='127.0.0.1', port=10000)
+        self.monitor.add_client(self.client)
+        self.updated = self.monitor.update_checks(self.client, [{'id': self.check.id, 'status': Check.STATUS['OK']}])
+        self.shard = RadarServerShard(Mock(), build_platform_setup(), None)
+        self.addCleanup(self.shard.socket.close)
+
+    def test_queue_message_carries_objects(self):
+        message = self.shard._build_queue_message(self.client, Message.TYPE['CHECK REPLY'], self.updated)
+        self.assertEqual(message['checks'], list(self.updated['checks']))
+        self.assertEqual(message['contacts'], [self.contact])
+        self.assertFalse('check_ids' in message)
+
+    def test_queue_message_is_copied_to_other_processes(self):
+        queue = ProcessQueue()
+        queue.put(self.shard._build_queue_message(self.client, Message.TYPE['CHECK REPLY'], self.updated))
+        message = queue.get(timeout=5)
+        check, = message['checks']
+        self.assertEqual(check, self.check)
+        self.assertEqual(check.current_status, Check.STATUS['OK'])
+        self.assertEqual(message['contacts'], [self.contact])
+
+    @raises(ServerListenError)
+    def test_shard_raises_listen_error_without_reuse_port(self):
+        with patch('radar.network.server.SO_REUSEPORT', None):
+            RadarServerShard(Mock(), build_platform_setup(), None)
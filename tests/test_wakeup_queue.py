@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from select import select
+from radar.misc import WakeupQueue, WakeupEvent
+
+
+class TestWakeupQueue(TestCase):
+    def setUp(self):
+        self.queue = WakeupQueue()
+
+    def _is_readable(self):
+        return select([self.queue], [], [], 0)[0] == [self.queue]
+
+    def test_empty_queue_is_not_readable(self):
+        self.assertFalse(self._is_readable())
+
+    def test_queue_is_readable_while_holding_items(self):
+        [self.queue.put(n) for n in range(3)]
+        self.assertTrue(self._is_readable())
+        [self.queue.get() for _ in range(2)]
+        self.assertTrue(self._is_readable())
+        self.queue.get()
+        self.assertFalse(self._is_readable())
+
+
+class TestWakeupEvent(TestCase):
+    def setUp(self):
+        self.event = WakeupEvent()
+
+    def test_event_is_readable_once_set(self):
+        self.assertEqual(select([self.event], [], [], 0)[0], [])
+        self.event.set()
+        self.assertEqual(select([self.event], [], [], 0)[0], [self.event])
+        self.assertTrue(self.event.is_set())